@@ -4,27 +4,34 @@ Orchestrates scraping from multiple sources and syncs to Supabase database
 """
 
 import os
+import queue
 import sys
 import time
 import argparse
 import json
 import re
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Any
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Dict, Iterator, Optional, Any
 import pandas as pd
 from dotenv import load_dotenv
+from postgrest.exceptions import APIError
 from supabase import create_client, Client
 
 # Add scrapers directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'scrapers'))
 
-from scripts.scrapers.olx_scraper import OLXScraper
+from scripts.scrapers.olx_scraper import OLXScraper, rps_from_env
 from scripts.scrapers.nekretnine_scraper import NekretnineScraper
 
 
 # Load environment variables
 load_dotenv()
 
+_FIRST_INT = re.compile(r'\d+')
+# 03.12.2025 | 2025-12-03 | 03/12/2025
+_DATE = re.compile(r'(\d{1,2})\.(\d{1,2})\.(\d{4})|(\d{4})-(\d{1,2})-(\d{1,2})|(\d{1,2})/(\d{1,2})/(\d{4})')
+
 
 # Field mapping dictionary - maps Bosnian field names to database columns
 FIELD_MAPPING = {
@@ -55,7 +62,7 @@ FIELD_MAPPING = {
 }
 
 # Boolean field indicators (field values that indicate True)
-BOOLEAN_INDICATORS = ['da', 'yes', 'true', '✓', '✔', 'ima']
+BOOLEAN_INDICATORS = frozenset(['da', 'yes', 'true', '✓', '✔', 'ima'])
 
 # Source to table mapping
 SOURCE_TABLES = {
@@ -85,9 +92,15 @@ class SupabaseSyncService:
             
             self.supabase = create_client(supabase_url, supabase_key)
         
+        # extra_<field> key -> (db column, parser), resolved once instead of per key
+        self._extra_columns = {
+            f'extra_{field_name}': (db_column, self._column_parser(db_column))
+            for field_name, db_column in FIELD_MAPPING.items()
+        }
+        
         # Initialize scrapers
         self.scrapers = {
-            'olx_ba': OLXScraper(delay=(2, 4)),
+            'olx_ba': OLXScraper(delay=(2, 4), max_rps=rps_from_env(2)),
             # 'nekretnine_ba': NekretnineScraper(delay=2.0),  # Uncomment when ready
         }
     
@@ -111,22 +124,55 @@ class SupabaseSyncService:
             'total_inserted': 0,
             'total_updated': 0,
             'total_errors': 0,
-            'started_at': datetime.now(),
+            'started_at': datetime.now(timezone.utc),
         }
         
-        for source_name, scraper in self.scrapers.items():
-            try:
+        # Scrapers run concurrently in worker threads and hand over batches;
+        # every Supabase write stays on this thread
+        batches = queue.Queue()
+        with ThreadPoolExecutor(max_workers=max(1, len(self.scrapers))) as pool:
+            for source_name, scraper in self.scrapers.items():
                 print(f"\n📡 Syncing source: {source_name.upper()}")
-                stats = self._sync_source(source_name, scraper, max_pages)
+                pool.submit(self._scrape_source, source_name, scraper, max_pages, batches)
+            
+            # Existing listings load while the scrapers are already running
+            source_stats = {
+                source_name: {
+                    'existing': {listing['external_id']: listing
+                                 for listing in self._iter_existing_listings(source_name)},
+                    'seen': set(),
+                    'scraped': 0, 'new': 0, 'updates': 0, 'inserted': 0, 'updated': 0,
+                }
+                for source_name in self.scrapers
+            }
+            
+            pending = len(self.scrapers)
+            while pending:
+                source_name, batch, error = batches.get()
+                stats = source_stats[source_name]
                 
-                total_stats['sources_synced'] += 1
+                if batch is not None:
+                    self._persist_batch(source_name, batch, stats)
+                    continue
+                
+                # Source finished (or failed); listings persisted so far still count
+                pending -= 1
                 total_stats['total_scraped'] += stats['scraped']
                 total_stats['total_inserted'] += stats['inserted']
                 total_stats['total_updated'] += stats['updated']
                 
-            except Exception as e:
-                print(f"❌ Error syncing {source_name}: {str(e)}")
-                total_stats['total_errors'] += 1
+                if error:
+                    print(f"❌ Error syncing {source_name}: {str(error)}")
+                    total_stats['total_errors'] += 1
+                    continue
+                
+                total_stats['sources_synced'] += 1
+                print(f"  ✅ {source_name}: scraped {stats['scraped']} listings")
+                print(f"  📊 New: {stats['new']}, Updates: {stats['updates']}")
+                if stats['new']:
+                    print(f"  ✅ Inserted {stats['inserted']} new listings")
+                if stats['updates']:
+                    print(f"  ✅ Updated {stats['updated']} listings")
         
         # Mark expired listings
         try:
@@ -135,7 +181,7 @@ class SupabaseSyncService:
         except Exception as e:
             print(f"⚠️  Warning: Could not mark expired listings: {str(e)}")
         
-        total_stats['finished_at'] = datetime.now()
+        total_stats['finished_at'] = datetime.now(timezone.utc)
         total_stats['duration_seconds'] = (total_stats['finished_at'] - total_stats['started_at']).total_seconds()
         
         # Log sync results
@@ -153,29 +199,41 @@ class SupabaseSyncService:
         
         return total_stats
     
-    def _sync_source(self, source_name: str, scraper, max_pages: int) -> Dict:
-        """Sync listings from a single source"""
-        
-        # Scrape listings
-        print(f"  🌐 Scraping {source_name}...")
-        scraped_listings = scraper.scrape_listings(max_pages=max_pages)
-        print(f"  ✅ Scraped {len(scraped_listings)} listings")
-        
-        if not scraped_listings:
-            return {'scraped': 0, 'inserted': 0, 'updated': 0}
-        
-        # Get existing listings from database
-        existing_listings = self._get_existing_listings(source_name)
-        existing_map = {listing['external_id']: listing for listing in existing_listings}
+    def _scrape_source(self, source_name: str, scraper, max_pages: int, out: queue.Queue):
+        """
+        Scrape a single source in a worker thread
+
+        Puts (source_name, batch, None) for each batch of listings, then
+        (source_name, None, error) once the source is done; error is None on success.
+        """
+        try:
+            print(f"  🌐 Scraping {source_name}...")
+            # Scrapers that can stream hand over batches while they keep scraping
+            if hasattr(scraper, 'iter_listings'):
+                for batch in scraper.iter_listings(max_pages=max_pages):
+                    out.put((source_name, batch, None))
+            else:
+                out.put((source_name, scraper.scrape_listings(max_pages=max_pages), None))
+            out.put((source_name, None, None))
+        except Exception as e:
+            out.put((source_name, None, e))
+    
+    def _persist_batch(self, source_name: str, scraped_listings: List[Dict], stats: Dict):
+        """Insert or update one batch of scraped listings, accumulating into stats"""
+        existing_map = stats['existing']
+        stats['scraped'] += len(scraped_listings)
         
         # Separate new and updated listings
         new_listings = []
         updated_listings = []
         
+        seen = stats['seen']
         for listing in scraped_listings:
             external_id = listing.get('external_id')
-            if not external_id:
+            # Pagination shifts can return the same listing twice in one sync
+            if not external_id or external_id in seen:
                 continue
+            seen.add(external_id)
             
             existing = existing_map.get(external_id)
             
@@ -187,44 +245,47 @@ class SupabaseSyncService:
             else:
                 new_listings.append(listing)
         
-        print(f"  📊 New: {len(new_listings)}, Updates: {len(updated_listings)}")
+        stats['new'] += len(new_listings)
+        stats['updates'] += len(updated_listings)
         
         # Insert new listings
-        inserted = 0
         if new_listings:
-            inserted = self._insert_listings(new_listings, source_name)
-            print(f"  ✅ Inserted {inserted} new listings")
+            stats['inserted'] += self._insert_listings(new_listings, source_name)
         
         # Update existing listings
-        updated = 0
         if updated_listings:
-            updated = self._update_listings(updated_listings, source_name)
-            print(f"  ✅ Updated {updated} listings")
-        
-        return {
-            'scraped': len(scraped_listings),
-            'inserted': inserted,
-            'updated': updated
-        }
+            stats['updated'] += self._update_listings(updated_listings, source_name)
     
-    def _get_existing_listings(self, source: str) -> List[Dict]:
-        """Get existing listings from Supabase for a source"""
+    def _iter_existing_listings(self, source: str, page_size: int = 1000) -> Iterator[Dict]:
+        """
+        Yield active listings from Supabase for a source
+
+        Pages by id (keyset) so results are not capped at PostgREST's 1000-row
+        limit and later pages stay cheap.
+        """
         try:
             # Get the correct table for this source
             table_name = SOURCE_TABLES.get(source)
             if not table_name:
                 print(f"  ⚠️  Warning: Unknown source '{source}', no table mapping found")
-                return []
-            
-            response = self.supabase.table(table_name) \
-                .select('id, external_id, price_numeric, title, last_updated') \
-                .eq('is_active', True) \
-                .execute()
+                return
             
-            return response.data if response.data else []
+            last_id = None
+            while True:
+                query = self.supabase.table(table_name) \
+                    .select('id, external_id, price_numeric, title, last_updated') \
+                    .eq('is_active', True)
+                if last_id is not None:
+                    query = query.gt('id', last_id)
+                response = query.order('id').limit(page_size).execute()
+                
+                rows = response.data or []
+                yield from rows
+                if len(rows) < page_size:
+                    break
+                last_id = rows[-1]['id']
         except Exception as e:
             print(f"  ⚠️  Warning: Could not fetch existing listings: {str(e)}")
-            return []
     
     def _needs_update(self, new_listing: Dict, existing_listing: Dict) -> bool:
         """Check if a listing needs to be updated"""
@@ -262,10 +323,7 @@ class SupabaseSyncService:
                 return 0
             
             # Prepare data for insertion
-            insert_data = []
-            for listing in listings:
-                data = self._transform_listing_data(listing)
-                insert_data.append(data)
+            insert_data = self._transform_listing_batch(listings)
             
             # Insert in batches of 100
             batch_size = 100
@@ -273,8 +331,9 @@ class SupabaseSyncService:
             
             for i in range(0, len(insert_data), batch_size):
                 batch = insert_data[i:i+batch_size]
-                response = self.supabase.table(table_name).insert(batch).execute()
-                total_inserted += len(response.data) if response.data else 0
+                # Errors raise, so a returned insert wrote the whole batch
+                self.supabase.table(table_name).insert(batch, returning='minimal').execute()
+                total_inserted += len(batch)
             
             return total_inserted
             
@@ -282,17 +341,25 @@ class SupabaseSyncService:
             print(f"  ❌ Error inserting listings: {str(e)}")
             return 0
     
-    def _transform_listing_data(self, listing: Dict) -> Dict[str, Any]:
+    def _transform_listing_batch(self, listings: List[Dict]) -> List[Dict[str, Any]]:
+        """Transform a batch of scraped listings, sharing one timestamp"""
+        now_iso = datetime.now(timezone.utc).isoformat()
+        transform = self._transform_listing_data
+        return [transform(listing, now_iso) for listing in listings]
+    
+    def _transform_listing_data(self, listing: Dict, now_iso: Optional[str] = None) -> Dict[str, Any]:
         """
         Transform scraped listing data to database format
         Maps extra_* fields to structured columns and JSONB
         
         Args:
             listing: Raw scraped listing data
+            now_iso: Timestamp for scraped_at/last_updated (defaults to now)
             
         Returns:
             Transformed data ready for database insertion
         """
+        now_iso = now_iso or datetime.now(timezone.utc).isoformat()
         # Start with base fields (excluding 'source' since it's implicit in the table)
         data = {
             'external_id': listing.get('external_id'),
@@ -305,8 +372,8 @@ class SupabaseSyncService:
             'thumbnail_url': listing.get('thumbnail_url'),
             'description': listing.get('description'),
             'posted_date': listing.get('posted_date'),
-            'scraped_at': datetime.now().isoformat(),
-            'last_updated': datetime.now().isoformat(),
+            'scraped_at': now_iso,
+            'last_updated': now_iso,
             'is_active': True,
         }
         
@@ -336,37 +403,35 @@ class SupabaseSyncService:
             if key in data or not key.startswith('extra_'):
                 continue
             
-            # Remove 'extra_' prefix
-            field_name = key[6:]
-            
             # Check if this field maps to a database column
-            if field_name in FIELD_MAPPING:
-                db_column = FIELD_MAPPING[field_name]
-                
-                # Handle boolean fields
-                if db_column.startswith('has_'):
-                    data[db_column] = self._parse_boolean(value)
-                # Handle numeric fields
-                elif db_column == 'bathrooms':
-                    data[db_column] = self._parse_integer(value)
-                # Handle date fields
-                elif db_column == 'publication_date':
-                    data[db_column] = self._parse_date(value)
-                # Handle text fields
-                else:
-                    data[db_column] = str(value) if value else None
+            mapped = self._extra_columns.get(key)
+            if mapped:
+                db_column, parse = mapped
+                data[db_column] = parse(value)
             else:
-                # Store unmapped fields in extra_fields JSON
-                extra_fields_json[field_name] = value
+                # Store unmapped fields in extra_fields JSON (without 'extra_' prefix)
+                extra_fields_json[key[6:]] = value
         
-        # Add extra_fields JSON column
-        if extra_fields_json:
-            data['extra_fields'] = json.dumps(extra_fields_json)
-        else:
-            data['extra_fields'] = '{}'
+        # Add extra_fields JSON column; the client encodes the whole row once,
+        # so pass the dict rather than a pre-encoded string
+        data['extra_fields'] = extra_fields_json
         
         return data
     
+    def _column_parser(self, db_column: str):
+        """Pick the value parser for a mapped database column"""
+        # Handle boolean fields
+        if db_column.startswith('has_'):
+            return self._parse_boolean
+        # Handle numeric fields
+        if db_column == 'bathrooms':
+            return self._parse_integer
+        # Handle date fields
+        if db_column == 'publication_date':
+            return self._parse_date
+        # Handle text fields
+        return lambda value: str(value) if value else None
+    
     def _parse_boolean(self, value: Any) -> bool:
         """Parse various boolean representations"""
         if isinstance(value, bool):
@@ -390,7 +455,7 @@ class SupabaseSyncService:
         
         try:
             # Extract first number from string
-            match = re.search(r'\d+', str(value))
+            match = _FIRST_INT.search(str(value))
             if match:
                 return int(match.group())
         except:
@@ -403,23 +468,23 @@ class SupabaseSyncService:
         if value is None:
             return None
         
-        value_str = str(value).strip()
-        
-        # Try common date formats
-        formats = [
-            '%d.%m.%Y',  # 03.12.2025
-            '%Y-%m-%d',  # 2025-12-03
-            '%d/%m/%Y',  # 03/12/2025
-        ]
+        # One match instead of trying strptime per format
+        match = _DATE.fullmatch(str(value).strip())
+        if not match:
+            return None
         
-        for fmt in formats:
-            try:
-                dt = datetime.strptime(value_str, fmt)
-                return dt.strftime('%Y-%m-%d')
-            except:
-                continue
+        g = match.groups()
+        if g[0]:
+            day, month, year = g[0:3]
+        elif g[3]:
+            year, month, day = g[3:6]
+        else:
+            day, month, year = g[6:9]
         
-        return None
+        try:
+            return date(int(year), int(month), int(day)).isoformat()
+        except ValueError:
+            return None
     
     def _update_listings(self, listings: List[Dict], source: str) -> int:
         """Update existing listings in Supabase"""
@@ -433,49 +498,66 @@ class SupabaseSyncService:
                 print(f"  ❌ Error: Unknown source '{source}', no table mapping found")
                 return 0
             
+            # Transform listing data (includes new fields)
+            listings = [listing for listing in listings if listing.get('id')]
+            update_rows = []
+            for listing, update_data in zip(listings, self._transform_listing_batch(listings)):
+                # Remove fields that shouldn't be updated; external_id stays so the
+                # upsert's insert half satisfies NOT NULL (it never changes).
+                # scraped_at is kept: it marks when the listing was last seen, which
+                # is what _mark_expired_listings expires on.
+                update_data.pop('source', None)
+                update_data.pop('is_active', None)
+                update_data['id'] = listing['id']
+                update_rows.append(update_data)
+            
+            # Upserted rows must share the same keys, otherwise PostgREST nulls the
+            # missing columns; group them so absent fields are left untouched
+            rows_by_keys = {}
+            for row in update_rows:
+                rows_by_keys.setdefault(frozenset(row), []).append(row)
+            
+            batch_size = 500
             updated_count = 0
+            history_rows = []
+            now_iso = datetime.now(timezone.utc).isoformat()
             
-            for listing in listings:
-                listing_id = listing.get('id')
-                if not listing_id:
-                    continue
-                
-                # Check if price changed (for price history)
-                old_price = None
-                try:
-                    old_response = self.supabase.table(table_name) \
-                        .select('price_numeric') \
-                        .eq('id', listing_id) \
-                        .single() \
+            for rows in rows_by_keys.values():
+                for i in range(0, len(rows), batch_size):
+                    batch = rows[i:i+batch_size]
+                    
+                    # Old prices for price history, one query per batch
+                    old_prices = {}
+                    try:
+                        old_response = self.supabase.table(table_name) \
+                            .select('id, price_numeric') \
+                            .in_('id', [row['id'] for row in batch]) \
+                            .execute()
+                        old_prices = {row['id']: row.get('price_numeric') for row in old_response.data or []}
+                    except Exception:
+                        pass
+                    
+                    # No need to echo the rows back; the batch already has ids and prices
+                    self.supabase.table(table_name) \
+                        .upsert(batch, on_conflict='id', returning='minimal') \
                         .execute()
-                    old_price = old_response.data.get('price_numeric') if old_response.data else None
-                except:
-                    pass
-                
-                # Transform listing data (includes new fields)
-                update_data = self._transform_listing_data(listing)
-                
-                # Remove fields that shouldn't be updated
-                update_data.pop('external_id', None)
-                update_data.pop('source', None)
-                update_data.pop('is_active', None)
-                update_data.pop('scraped_at', None)
-                
-                # Update last_updated
-                update_data['last_updated'] = datetime.now().isoformat()
-                
-                response = self.supabase.table(table_name) \
-                    .update(update_data) \
-                    .eq('id', listing_id) \
-                    .execute()
-                
-                if response.data:
-                    updated_count += 1
                     
-                    # Save price history if price changed
-                    new_price = listing.get('price_numeric')
-                    if old_price and new_price and old_price != new_price:
-                        self._save_price_history(listing_id, old_price, new_price)
+                    for row in batch:
+                        updated_count += 1
+                        
+                        # Save price history if price changed
+                        old_price = old_prices.get(row['id'])
+                        new_price = row.get('price_numeric')
+                        if old_price and new_price and old_price != new_price:
+                            history_rows.append({
+                                'listing_id': row['id'],
+                                'old_price': old_price,
+                                'new_price': new_price,
+                                'changed_at': now_iso,
+                            })
+            
+            if history_rows:
+                self._save_price_history(history_rows)
             
             return updated_count
             
@@ -483,36 +565,60 @@ class SupabaseSyncService:
             print(f"  ❌ Error updating listings: {str(e)}")
             return 0
     
-    def _save_price_history(self, listing_id: int, old_price: float, new_price: float):
-        """Save price change to history table"""
+    def _save_price_history(self, rows: List[Dict]):
+        """Save price changes to history table"""
         try:
-            self.supabase.table('price_history').insert({
-                'listing_id': listing_id,
-                'old_price': old_price,
-                'new_price': new_price,
-                'changed_at': datetime.now().isoformat()
-            }).execute()
+            self.supabase.table('price_history').insert(rows, returning='minimal').execute()
         except Exception as e:
             print(f"  ⚠️  Warning: Could not save price history: {str(e)}")
     
     def _mark_expired_listings(self, days: int = 7) -> int:
-        """Mark listings as inactive if not scraped recently"""
+        """
+        Mark listings as inactive if not scraped recently
+        
+        Uses the mark_expired RPC when it exists (one round-trip, only counts
+        come back), otherwise updates each table. The RPC, run once in the
+        Supabase SQL editor:
+        
+            create or replace function mark_expired(tables text[], days int default 7)
+            returns table (table_name text, marked bigint)
+            language plpgsql as $$
+            begin
+              foreach table_name in array tables loop
+                execute format(
+                  'update %I set is_active = false '
+                  'where is_active and scraped_at < now() - make_interval(days => $1)', table_name
+                ) using days;
+                get diagnostics marked = row_count;
+                return next;
+              end loop;
+            end $$;
+        """
         try:
-            cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
+            try:
+                response = self.supabase.rpc('mark_expired', {
+                    'tables': list(SOURCE_TABLES.values()),
+                    'days': days,
+                }).execute()
+                return sum(row['marked'] for row in response.data or [])
+            except APIError:
+                pass  # function not installed; update each table
+            
+            cutoff_date = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
             total_marked = 0
             
-            # Mark expired listings in each source table
+            # Mark expired listings in each source table; only the count comes back
             for table_name in SOURCE_TABLES.values():
                 try:
                     response = self.supabase.table(table_name) \
                         .update({
                             'is_active': False,
-                        }) \
+                        }, count='exact', returning='minimal') \
                         .eq('is_active', True) \
                         .lt('scraped_at', cutoff_date) \
                         .execute()
                     
-                    total_marked += len(response.data) if response.data else 0
+                    total_marked += response.count or 0
                 except Exception as e:
                     print(f"  ⚠️  Warning: Could not mark expired listings in {table_name}: {str(e)}")
             
@@ -535,7 +641,7 @@ class SupabaseSyncService:
                 'total_updated': stats['total_updated'],
                 'total_errors': stats['total_errors'],
                 'success': stats['total_errors'] == 0
-            }).execute()
+            }, returning='minimal').execute()
         except Exception as e:
             print(f"  ⚠️  Warning: Could not log sync: {str(e)}")
     
@@ -567,8 +673,9 @@ class SyncScheduler:
         self.sync_service = sync_service
         self.full_sync_interval = full_sync_hours * 3600
         self.incremental_sync_interval = incremental_sync_hours * 3600
-        self.last_full_sync = 0
-        self.last_incremental_sync = 0
+        # Monotonic deadlines; None means due immediately
+        self.next_full_sync = None
+        self.next_incremental_sync = None
     
     def run_forever(self):
         """Run scheduled syncs forever"""
@@ -578,22 +685,29 @@ class SyncScheduler:
         print("Press Ctrl+C to stop\n")
         
         try:
+            now = time.monotonic()
+            if self.next_full_sync is None:
+                self.next_full_sync = now
+            if self.next_incremental_sync is None:
+                self.next_incremental_sync = now
+            
             while True:
-                current_time = time.time()
+                current_time = time.monotonic()
                 
                 # Check if full sync is due
-                if current_time - self.last_full_sync >= self.full_sync_interval:
+                if current_time >= self.next_full_sync:
                     self.sync_service.sync_all_sources(max_pages=10)
-                    self.last_full_sync = current_time
-                    self.last_incremental_sync = current_time  # Reset incremental timer
+                    self.next_full_sync = current_time + self.full_sync_interval
+                    self.next_incremental_sync = current_time + self.incremental_sync_interval  # Reset incremental timer
                 
                 # Check if incremental sync is due
-                elif current_time - self.last_incremental_sync >= self.incremental_sync_interval:
+                elif current_time >= self.next_incremental_sync:
                     self.sync_service.incremental_sync(pages=5)
-                    self.last_incremental_sync = current_time
+                    self.next_incremental_sync = current_time + self.incremental_sync_interval
                 
-                # Sleep for 1 minute before checking again
-                time.sleep(60)
+                # Sleep until the next sync is due instead of polling every minute
+                next_due = min(self.next_full_sync, self.next_incremental_sync)
+                time.sleep(max(0, next_due - time.monotonic()))
                 
         except KeyboardInterrupt:
             print("\n\n⏹️  Scheduler stopped by user")
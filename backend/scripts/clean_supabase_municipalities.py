@@ -10,14 +10,20 @@ Requires SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY (or SUPABASE_KEY) in env.
 
 import argparse
 import os
-from typing import Iterable, Tuple
+from collections import defaultdict
+from functools import lru_cache
+from typing import Iterable, List, Tuple
 
 from dotenv import load_dotenv
 from supabase import Client, create_client
 
 from municipality_mapper import map_municipality
 
+# Ids per PostgREST request; keeps the in.(...) filter well under URL length limits
+BATCH_SIZE = 200
 
+
+@lru_cache(maxsize=None)
 def supabase_client() -> Client:
     load_dotenv()
     url = os.getenv("SUPABASE_URL")
@@ -40,27 +46,39 @@ def clean_table(client: Client, table: str, apply_changes: bool) -> Tuple[int, i
     dropped: rows set inactive because they could not be mapped
     """
     rows = fetch_municipalities(client, table)
-    updated = dropped = 0
     total = len(rows)
 
+    # Raw values repeat heavily, so map each distinct value once
+    ids_by_raw = defaultdict(list)
     for row in rows:
-        raw = row.get("municipality")
+        ids_by_raw[row.get("municipality")].append(row["id"])
+
+    # Group ids by target value so each batch is a single update/delete request
+    to_drop: List = []
+    to_update = defaultdict(list)
+    for raw, ids in ids_by_raw.items():
         mapped = map_municipality(raw)
-        row_id = row["id"]
 
         if mapped is None:
-            dropped += 1
-            if apply_changes:
-                client.table(table).update({"is_active": False}).eq("id", row_id).execute()
-                client.table(table).delete().eq("id", row_id).execute()
-            continue
-
-        if mapped != raw:
-            updated += 1
-            if apply_changes:
-                client.table(table).update({"municipality": mapped}).eq("id", row_id).execute()
-
-    return updated, dropped, total
+            to_drop.extend(ids)
+        elif mapped != raw:
+            to_update[mapped].extend(ids)
+
+    if apply_changes:
+        for mapped, ids in to_update.items():
+            for chunk in _chunks(ids):
+                client.table(table).update({"municipality": mapped}).in_("id", chunk).execute()
+        for chunk in _chunks(to_drop):
+            client.table(table).update({"is_active": False}).in_("id", chunk).execute()
+            client.table(table).delete().in_("id", chunk).execute()
+
+    updated = sum(len(ids) for ids in to_update.values())
+    return updated, len(to_drop), total
+
+
+def _chunks(ids: List, size: int = BATCH_SIZE):
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
 
 
 def main(tables: Iterable[str], apply_changes: bool):
@@ -9,6 +9,7 @@ Usage example (pandas):
 
 import argparse
 import re
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
@@ -27,6 +28,7 @@ CANONICAL = {
     "Trnovo",
 }
 CANONICAL_LOWER = {c.lower() for c in CANONICAL}
+_CANONICAL_BY_LOWER = {c.lower(): c for c in CANONICAL}
 
 
 # Ordered list of (regex, canonical) pairs
@@ -51,11 +53,25 @@ PATTERN_MAP = [
     (re.compile(r"trnovo", re.I), "Trnovo"),
 ]
 
+# All PATTERN_MAP entries fused into one regex. Each alternative is an anchored
+# lookahead followed by an empty named group, so alternatives are tried in
+# PATTERN_MAP order (first listed wins, not leftmost match) and m.lastgroup
+# names the bucket.
+_FUSED = re.compile(
+    "^(?:" + "|".join(
+        f"(?=.*?(?:{pattern.pattern}))(?P<m{i}>)" for i, (pattern, _) in enumerate(PATTERN_MAP)
+    ) + ")",
+    re.I | re.S,
+)
+_GROUP_TO_CANON = {f"m{i}": target for i, (_, target) in enumerate(PATTERN_MAP)}
 
+
+@lru_cache(maxsize=8192)
 def map_municipality(raw: Optional[str]) -> Optional[str]:
     """
     Map a raw municipality/location string to a canonical municipality.
     Returns None when no match is found (caller can drop those rows).
+    Results are cached, since the same raw strings repeat across rows.
     """
     if not raw:
         return None
@@ -66,15 +82,11 @@ def map_municipality(raw: Optional[str]) -> Optional[str]:
     # Already canonical?
     if lower in CANONICAL_LOWER:
         # Preserve original casing if user passed it canonical already
-        return next(c for c in CANONICAL if c.lower() == lower)
-
-    # Match patterns
-    for pattern, target in PATTERN_MAP:
-        if pattern.search(text):
-            return target
+        return _CANONICAL_BY_LOWER[lower]
 
-    # Unmapped
-    return None
+    # Match patterns (one regex pass, PATTERN_MAP priority preserved)
+    m = _FUSED.search(text)
+    return _GROUP_TO_CANON[m.lastgroup] if m else None
 
 
 def normalize_municipality_column(series):
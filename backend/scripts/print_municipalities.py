@@ -10,13 +10,16 @@ Usage:
 import argparse
 import os
 from collections import Counter
+from functools import lru_cache
 from pathlib import Path
 
 import pandas as pd
 from dotenv import load_dotenv
+from postgrest.exceptions import APIError
 from supabase import create_client
 
 
+@lru_cache(maxsize=None)
 def supabase_client():
     load_dotenv()
     url = os.getenv("SUPABASE_URL")
@@ -27,10 +30,32 @@ def supabase_client():
 
 
 def municipalities_from_supabase(table: str, active_only: bool = True) -> Counter:
+    """
+    Count municipalities server-side via the municipality_counts RPC when it
+    exists, otherwise page through the rows and count them here.
+
+    The RPC (run once in the Supabase SQL editor):
+
+        create or replace function municipality_counts(table_name text, active_only boolean default true)
+        returns table (municipality text, count bigint)
+        language plpgsql stable as $$
+        begin
+          return query execute format(
+            'select coalesce(nullif(municipality, ''''), ''Unknown''), count(*) '
+            'from %I where not $1 or is_active group by 1', table_name
+          ) using active_only;
+        end $$;
+    """
     client = supabase_client()
+    try:
+        resp = client.rpc("municipality_counts", {"table_name": table, "active_only": active_only}).execute()
+        return Counter({row["municipality"]: row["count"] for row in resp.data or []})
+    except APIError:
+        pass  # function not installed; fall back to client-side counting
+
     batch_size = 1000  # PostgREST default limit is 1000; pull in batches
     offset = 0
-    values = []
+    counts = Counter()
 
     while True:
         query = client.table(table).select("municipality").range(offset, offset + batch_size - 1)
@@ -40,12 +65,12 @@ def municipalities_from_supabase(table: str, active_only: bool = True) -> Counte
         rows = resp.data or []
         if not rows:
             break
-        values.extend(row.get("municipality") or "Unknown" for row in rows)
+        counts.update(row.get("municipality") or "Unknown" for row in rows)
         if len(rows) < batch_size:
             break
         offset += batch_size
 
-    return Counter(values)
+    return counts
 
 
 def municipalities_from_csv(csv_path: str) -> Counter:
@@ -5,21 +5,35 @@ Based on the proven notebook implementation
 """
 
 import os
+import sys
 import time
+import hashlib
 import re
 import math
 import random
 import logging
+import queue
+import shelve
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urljoin
-from bs4 import BeautifulSoup
+import soupsieve as sv
+from bs4 import BeautifulSoup, SoupStrainer
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options as ChromeOptions
 from selenium.webdriver.chrome.service import Service
 from selenium.common.exceptions import WebDriverException, TimeoutException
 from datetime import datetime
-from typing import List, Dict, Optional, Set
+from typing import List, Dict, Optional, Set, Iterator, Tuple
 from supabase import Client
 
+# rate_limit sits next to this file; importable whether the scrapers are
+# loaded as a package or run directly
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from rate_limit import RateLimiter
+
 # Optional: Google Maps for geocoding fallback
 try:
     import googlemaps
@@ -31,6 +45,28 @@ except ImportError:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Compiled CSS selectors (detail page)
+_SEL_DETAIL_TITLE = sv.compile("div.listing-titlebar-title h2")
+_SEL_DETAIL_ADDRESS = sv.compile("a.listing-address")
+_SEL_DETAIL_PRICE = sv.compile("span.re-slidep")
+_SEL_SIDEBAR_ITEMS = sv.compile("ul.listing-details-sidebar li")
+# Carousel slides; slick clones slides for looping, so clones are skipped
+_SEL_CAROUSEL_LINKS = sv.compile("a.item:not(.slick-cloned)")
+# <b> labels of the detail sections, each followed by a <div> with the value
+_SECTION_LABELS = ("TIP", "SUBJEKT", "BROJ SOBA", "POVRŠINA")
+
+# Deletes every Latin-1 character except ASCII digits (covers currency text and nbsp)
+_NON_DIGITS = str.maketrans('', '', ''.join(chr(c) for c in range(256) if not '0' <= chr(c) <= '9'))
+
+
+def _digits_only(text: str) -> str:
+    """Return only the ASCII digits of text"""
+    digits = text.translate(_NON_DIGITS)
+    if not digits.isascii():
+        # Characters outside Latin-1 (e.g. '€') are not in the table
+        digits = ''.join(ch for ch in digits if '0' <= ch <= '9')
+    return digits
+
 
 class NekretnineScraper:
     """Scraper for Nekretnine.ba property listings using Selenium"""
@@ -38,6 +74,8 @@ class NekretnineScraper:
     # Base URL for Sarajevo Canton flats - matching your notebook
     BASE_URL = "https://nekretnine.ba/listing.php?lang=ba&sel=nekretnine&grad=65&naselje=&kat=3&subjekt=2&cij1=&cij2=&pov1=&pov2=&spr1=&spr2=&firma=&page={}"
     DETAIL_URL_PATTERN = r"^real-estate\.php\?lang=ba&sel=nekretnine&view="
+    # Search pages only need the detail links, so only those anchors are built
+    _DETAIL_LINKS = SoupStrainer("a", href=re.compile(DETAIL_URL_PATTERN))
     
     # Neighborhood to municipality mapping - from your notebook
     NEIGHBORHOOD_MAPPING = {
@@ -75,15 +113,31 @@ class NekretnineScraper:
         'Hadžići': 'Hadžići', 'Vogošća': 'Vogošća', 'Ilijaš': 'Ilijaš', 'Trnovo': 'Trnovo'
     }
     
-    def __init__(self, delay: tuple = (2, 5), headless: bool = True, supabase_client: Client = None, google_maps_api_key: str = None):
+    # Pre-lowercased (neighborhood, municipality) pairs for _standardize_municipality
+    _NEIGHBORHOODS_LOWER = tuple((k.lower(), v) for k, v in NEIGHBORHOOD_MAPPING.items())
+    
+    # BROJ SOBA text -> number of rooms
+    ROOM_MAPPING = {
+        'garsonjera': 0.5, 'jednosoban': 1, 'jednoiposoban': 1.5,
+        'dvosoban': 2, 'dvoiposoban': 2.5, 'trosoban': 3,
+        'troiposoban': 3.5, 'četvorosoban': 4, 'peterosoban': 5
+    }
+    
+    # Concurrent detail-page workers (one browser each)
+    DETAIL_WORKERS = 4
+    
+    def __init__(self, delay: tuple = (2, 5), headless: bool = True, supabase_client: Client = None, google_maps_api_key: str = None,
+                 cache_path: str = None, cache_max_age: float = 24 * 3600):
         """
         Initialize scraper with Selenium
         
         Args:
-            delay: Tuple of (min, max) delay between requests in seconds
+            delay: Delay between requests in seconds, or a (min, max) tuple
             headless: Run browser in headless mode
             supabase_client: Optional Supabase client for duplicate checking and saving
             google_maps_api_key: Optional Google Maps API key for geocoding fallback
+            cache_path: Optional shelve file for caching parsed listings by external_id
+            cache_max_age: Seconds a cached listing is trusted before it is fetched again
         """
         self.delay = delay
         self.headless = headless
@@ -91,6 +145,27 @@ class NekretnineScraper:
         self.supabase = supabase_client
         self.existing_urls: Set[str] = set()
         
+        # Browsers for scrape_detail_pages, kept for the whole run; a WebDriver is
+        # not thread-safe, so each one is checked out by a single worker.
+        # Slots hold None until a driver is first needed.
+        self._driver_pool: queue.Queue = queue.Queue()
+        for _ in range(self.DETAIL_WORKERS):
+            self._driver_pool.put(None)
+        self._pool_drivers = []
+        self._pool_lock = threading.Lock()
+        
+        # Detail pages share one request budget: on average one request per
+        # `delay` seconds (a number or a (min, max) range), however many
+        # workers are running. A zero delay disables the limit.
+        mean_delay = sum(delay) / len(delay) if isinstance(delay, (tuple, list)) else delay
+        self._limiter = RateLimiter(1 / mean_delay) if mean_delay > 0 else None
+        
+        # On-disk cache of parsed listings (opened lazily)
+        self.cache_path = cache_path
+        self.cache_max_age = cache_max_age
+        self._cache = None
+        self._cache_lock = threading.Lock()
+        
         # Initialize Google Maps client if API key provided
         self.gmaps = None
         if google_maps_api_key and GOOGLEMAPS_AVAILABLE:
@@ -119,10 +194,10 @@ class NekretnineScraper:
             # Set page load strategy to not wait for full page load
             options.set_capability("pageLoadStrategy", "none")
             
-            self.driver = webdriver.Chrome(options=options)
-            self.driver.set_page_load_timeout(10)
+            driver = webdriver.Chrome(options=options)
+            driver.set_page_load_timeout(10)
             logger.info("WebDriver started successfully")
-            return self.driver
+            return driver
         except Exception as e:
             logger.error(f"Failed to start Chrome driver: {e}")
             return None
@@ -137,7 +212,7 @@ class NekretnineScraper:
         """Extract price as integer from text"""
         if not text:
             return None
-        cleaned = re.sub(r"[^0-9]", "", text)
+        cleaned = _digits_only(text)
         return int(cleaned) if cleaned else None
     
     @staticmethod
@@ -149,6 +224,7 @@ class NekretnineScraper:
         return int(m.group(1)) if m else None
     
     @staticmethod
+    @lru_cache(maxsize=4096)
     def extract_external_id(url: str) -> Optional[str]:
         """Extract external ID from Nekretnine URL"""
         if not url:
@@ -165,7 +241,6 @@ class NekretnineScraper:
             return f"nekretnine_{path_match.group(1)}"
         
         # Fallback: use hash of URL
-        import hashlib
         url_hash = hashlib.md5(url.encode()).hexdigest()[:12]
         return f"nekretnine_{url_hash}"
     
@@ -255,23 +330,60 @@ class NekretnineScraper:
         search_text = f"{municipality} {title} {description}".lower()
         
         # Try to find matching neighborhood
-        for neighborhood, target_municipality in self.NEIGHBORHOOD_MAPPING.items():
-            if neighborhood.lower() in search_text:
+        for neighborhood, target_municipality in self._NEIGHBORHOODS_LOWER:
+            if neighborhood in search_text:
                 return target_municipality
         
         # Return as-is if no mapping found
         return municipality
     
-    def fetch_page_source(self, url: str, short_wait: int = 10) -> Optional[str]:
+    @contextmanager
+    def _acquire_driver(self):
+        """Check out a pooled WebDriver, creating it on first use; None if it cannot start"""
+        driver = self._driver_pool.get()
+        try:
+            if driver is None:
+                driver = self._create_driver()
+                if driver:
+                    with self._pool_lock:
+                        self._pool_drivers.append(driver)
+            yield driver
+        finally:
+            self._driver_pool.put(driver)
+    
+    def _cache_get(self, external_id: str) -> Optional[Dict]:
+        """Return a previously parsed listing from the on-disk cache, unless it is stale"""
+        if not self.cache_path or not external_id:
+            return None
+        with self._cache_lock:
+            if self._cache is None:
+                self._cache = shelve.open(self.cache_path)
+            entry = self._cache.get(external_id)
+        # Prices and attributes change, so entries expire after cache_max_age
+        if not entry or time.time() - entry.get('fetched_at', 0) > self.cache_max_age:
+            return None
+        return entry.get('listing')
+    
+    def _cache_put(self, listing: Dict):
+        """Store a parsed listing in the on-disk cache"""
+        if not self.cache_path or not listing.get('external_id'):
+            return
+        with self._cache_lock:
+            if self._cache is None:
+                self._cache = shelve.open(self.cache_path)
+            self._cache[listing['external_id']] = {'fetched_at': time.time(), 'listing': listing}
+    
+    def fetch_page_source(self, url: str, short_wait: int = 10, driver=None) -> Optional[str]:
         """
         Load URL and return HTML (may be partial)
         Based on your notebook's fetch_page_source function
         """
+        driver = driver or self.driver
         try:
             logger.debug(f"Loading URL: {url}")
-            self.driver.get(url)
+            driver.get(url)
             time.sleep(short_wait)
-            return self.driver.page_source
+            return driver.page_source
         except (TimeoutException, WebDriverException, OSError) as e:
             logger.warning(f"Failed to load page {url}: {e}")
             return None
@@ -309,20 +421,11 @@ class NekretnineScraper:
                 return []
             
             # Find all image links - they have class 'item mfp-gallery'
-            # Note: slick clones slides, so we need to filter duplicates
-            image_links = slider.find_all('a', class_='item')
-            
-            for link in image_links:
-                # Skip cloned slides (they have slick-cloned class)
-                if 'slick-cloned' in link.get('class', []):
-                    continue
-                
-                # Try href first (primary source)
-                img_url = link.get('href')
-                
-                # Fallback to data-background-image
-                if not img_url:
-                    img_url = link.get('data-background-image')
+            # Cloned slides are excluded by the selector itself
+            for link in _SEL_CAROUSEL_LINKS.select(slider):
+                # Try href first (primary source), then data-background-image
+                attrs = link.attrs
+                img_url = attrs.get('href') or attrs.get('data-background-image')
                 
                 # Validate and clean URL
                 if img_url:
@@ -458,12 +561,12 @@ class NekretnineScraper:
             logger.warning(f"Geocoding failed for '{address}': {e}")
             return None, None
     
-    def parse_detail_page(self, url: str) -> Optional[Dict]:
+    def parse_detail_page(self, url: str, driver=None) -> Optional[Dict]:
         """
         Parse listing detail page
         Based on the actual HTML structure from nekretnine.ba
         """
-        html = self.fetch_page_source(url)
+        html = self.fetch_page_source(url, driver=driver)
         if not html:
             return None
         
@@ -472,7 +575,7 @@ class NekretnineScraper:
             
             # Extract title from titlebar (format: "Sarajevo <span>Prodaja</span>")
             # The actual title is in the h2, and location is the first text node
-            title_elem = soup.select_one("div.listing-titlebar-title h2")
+            title_elem = _SEL_DETAIL_TITLE.select_one(soup)
             title = None
             if title_elem:
                 # Remove the tag span to get clean title
@@ -483,13 +586,13 @@ class NekretnineScraper:
             
             # Extract full location/address from listing-address link
             # Format: "Trosoban renoviran stan Marijin Dvor, 101(110) m2, #13731"
-            address_elem = soup.select_one("a.listing-address")
+            address_elem = _SEL_DETAIL_ADDRESS.select_one(soup)
             address_full = self.clean_text(address_elem.get_text()) if address_elem else None
             municipality_raw = title  # Use the main title (e.g., "Sarajevo") as municipality
             
             # Extract price from sidebar red box (CIJENA section)
             # The price is in a span.re-slidep with font-weight:700
-            price_elem = soup.select_one("span.re-slidep")
+            price_elem = _SEL_DETAIL_PRICE.select_one(soup)
             price_numeric = None
             if price_elem:
                 price_text = price_elem.get_text()
@@ -499,9 +602,14 @@ class NekretnineScraper:
                 elif "upit" in price_text.lower():
                     price_numeric = None  # Price on request
             
+            # Find all labelled sections in one walk; the first of each label wins
+            sections = {}
+            for label in soup.find_all("b", string=_SECTION_LABELS):
+                sections.setdefault(label.string, label)
+            
             # Extract property type from TIP section
             # Structure: <b>TIP</b> followed by <div> with content like "Stambeni prostor"
-            property_type_elem = soup.find("b", string="TIP")
+            property_type_elem = sections.get("TIP")
             property_type = None
             if property_type_elem:
                 type_div = property_type_elem.find_next("div")
@@ -510,7 +618,7 @@ class NekretnineScraper:
             
             # Extract ad type from SUBJEKT section
             # Content like "Prodaja" or "Iznajmljivanje"
-            ad_type_elem = soup.find("b", string="SUBJEKT")
+            ad_type_elem = sections.get("SUBJEKT")
             ad_type = None
             if ad_type_elem:
                 subjekt_div = ad_type_elem.find_next("div")
@@ -519,20 +627,15 @@ class NekretnineScraper:
             
             # Extract rooms from BROJ SOBA section
             # Content like "Dvosoban", "Trosoban", "2.5", etc.
-            rooms_elem = soup.find("b", string="BROJ SOBA")
+            rooms_elem = sections.get("BROJ SOBA")
             rooms = None
             if rooms_elem:
                 rooms_div = rooms_elem.find_next("div")
                 if rooms_div:
                     rooms_text = self.clean_text(rooms_div.get_text())
                     # Map text to numbers
-                    room_mapping = {
-                        'garsonjera': 0.5, 'jednosoban': 1, 'jednoiposoban': 1.5,
-                        'dvosoban': 2, 'dvoiposoban': 2.5, 'trosoban': 3,
-                        'troiposoban': 3.5, 'četvorosoban': 4, 'peterosoban': 5
-                    }
                     rooms_lower = rooms_text.lower() if rooms_text else ''
-                    for key, val in room_mapping.items():
+                    for key, val in self.ROOM_MAPPING.items():
                         if key in rooms_lower:
                             rooms = val
                             break
@@ -542,7 +645,7 @@ class NekretnineScraper:
             
             # Extract square meters from POVRŠINA section
             # Format: "101 m2" or "101(110) m2"
-            square_m2_elem = soup.find("b", string="POVRŠINA")
+            square_m2_elem = sections.get("POVRŠINA")
             square_m2 = None
             if square_m2_elem:
                 area_div = square_m2_elem.find_next("div")
@@ -599,9 +702,8 @@ class NekretnineScraper:
                     agency_name = self.clean_text(agency_link.get_text())
             
             # Extract contact details from sidebar list
-            sidebar_details = soup.select("ul.listing-details-sidebar li")
+            sidebar_details = _SEL_SIDEBAR_ITEMS.select(soup)
             for li in sidebar_details:
-                text = li.get_text(strip=True)
                 # Phone numbers
                 if li.find("i", class_="fa-mobile") or li.find("i", class_="sl-icon-globe"):
                     # Remove icon and get text
@@ -687,11 +789,8 @@ class NekretnineScraper:
             return []
         
         try:
-            soup = BeautifulSoup(html, "lxml")
-            links = [
-                urljoin("https://nekretnine.ba/", a["href"])
-                for a in soup.find_all("a", href=re.compile(self.DETAIL_URL_PATTERN))
-            ]
+            soup = BeautifulSoup(html, "lxml", parse_only=self._DETAIL_LINKS)
+            links = [urljoin("https://nekretnine.ba/", a["href"]) for a in soup.find_all("a")]
             
             logger.info(f"Found {len(links)} listings on page {page_num}")
             return links
@@ -700,6 +799,49 @@ class NekretnineScraper:
             logger.error(f"Failed to parse search page {page_num}: {e}")
             return []
     
+    def scrape_detail_pages(self, urls: List[str], max_workers: int = DETAIL_WORKERS) -> Iterator[Tuple[str, Optional[Dict]]]:
+        """
+        Fetch and parse detail pages concurrently
+        
+        Each worker checks out a browser from the pool; pacing is enforced
+        globally by the shared rate limiter instead of a sleep after every page.
+        Listings already in the on-disk cache are returned without a fetch.
+        
+        Args:
+            urls: Detail page URLs to scrape
+            max_workers: Number of concurrent browser workers
+            
+        Yields:
+            (url, listing) tuples in completion order; listing is None on failure
+        """
+        workers = max(1, min(max_workers, self.DETAIL_WORKERS, len(urls)))
+        
+        def worker(url: str) -> Optional[Dict]:
+            cached = self._cache_get(self.extract_external_id(url))
+            if cached:
+                logger.debug(f"Cache hit: {url}")
+                return cached
+            
+            with self._acquire_driver() as driver:
+                if not driver:
+                    return None
+                if self._limiter:
+                    self._limiter.acquire()
+                listing = self.parse_detail_page(url, driver=driver)
+            if listing:
+                self._cache_put(listing)
+            return listing
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(worker, url): url for url in urls}
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    yield url, future.result()
+                except Exception as e:
+                    logger.error(f"Detail worker failed for {url}: {e}")
+                    yield url, None
+    
     def scrape_listings(self, max_pages: int = 10, save_per_page: bool = True) -> Dict:
         """
         Main scraping method with page-by-page saving
@@ -754,18 +896,13 @@ class NekretnineScraper:
                 logger.info(f"  Scraping details for {len(new_urls)} new listings...")
                 page_listings = []
                 
-                for i, url in enumerate(new_urls, 1):
-                    logger.info(f"    [{i}/{len(new_urls)}] Scraping: {url[:80]}...")
-                    
-                    listing_data = self.parse_detail_page(url)
+                for i, (url, listing_data) in enumerate(self.scrape_detail_pages(new_urls), 1):
+                    logger.info(f"    [{i}/{len(new_urls)}] Scraped: {url[:80]}...")
                     if listing_data:
                         page_listings.append(listing_data)
-                        logger.info(f"      ✓ Success: {listing_data.get('title', 'N/A')[:50]}...")
+                        logger.info(f"      ✓ Success: {(listing_data.get('title') or 'N/A')[:50]}...")
                     else:
                         logger.warning(f"      ✗ Failed to parse")
-                    
-                    # Respectful delay between detail pages
-                    time.sleep(random.uniform(*self.delay))
                 
                 all_listings.extend(page_listings)
                 
@@ -813,7 +950,28 @@ class NekretnineScraper:
             self.cleanup()
     
     def cleanup(self):
-        """Close the browser"""
+        """Close the browser and any worker browsers"""
+        with self._pool_lock:
+            pool_drivers, self._pool_drivers = self._pool_drivers, []
+        for driver in pool_drivers:
+            try:
+                driver.quit()
+            except:
+                pass
+        # Reset the pool slots so drivers are recreated on next use
+        while True:
+            try:
+                self._driver_pool.get_nowait()
+            except queue.Empty:
+                break
+        for _ in range(self.DETAIL_WORKERS):
+            self._driver_pool.put(None)
+        
+        with self._cache_lock:
+            if self._cache is not None:
+                self._cache.close()
+                self._cache = None
+        
         if self.driver:
             try:
                 self.driver.quit()
@@ -827,325 +985,6 @@ class NekretnineScraper:
         self.cleanup()
 
 
-if __name__ == "__main__":
-    # Test the scraper
-    scraper = NekretnineScraper()
-    listings = scraper.scrape_listings(max_pages=2)
-    print(f"\nScraped {len(listings)} listings")
-    if listings:
-        print("\nSample listing:")
-        import json
-        print(json.dumps(listings[0], indent=2, ensure_ascii=False))
-    
-    def scrape_listings(self, 
-                       property_type: str = 'stan',
-                       ad_type: str = 'prodaja',
-                       location: str = '',
-                       max_pages: int = 10) -> List[Dict]:
-        """
-        Scrape property listings from search results
-        
-        Args:
-            property_type: Type of property (stan, kuća, etc.)
-            ad_type: Type of ad (prodaja, iznajmljivanje)
-            location: Location filter
-            max_pages: Maximum number of pages to scrape
-            
-        Returns:
-            List of property dictionaries
-        """
-        all_listings = []
-        
-        for page in range(1, max_pages + 1):
-            logger.info(f"Scraping page {page}/{max_pages}")
-            
-            # Build search URL
-            params = {
-                'tip_nekretnine': property_type,
-                'vrsta_oglasa': ad_type,
-                'stranica': page
-            }
-            
-            if location:
-                params['grad'] = location
-            
-            try:
-                response = self.session.get(
-                    self.SEARCH_URL,
-                    params=params,
-                    timeout=15
-                )
-                
-                if response.status_code != 200:
-                    logger.warning(f"Got status {response.status_code} for page {page}")
-                    break
-                
-                listings = self._parse_listings_page(response.text, page)
-                
-                if not listings:
-                    logger.info(f"No listings found on page {page}")
-                    break
-                
-                all_listings.extend(listings)
-                logger.info(f"Found {len(listings)} listings on page {page}")
-                
-                # Respectful delay
-                if page < max_pages:
-                    time.sleep(self.delay)
-                    
-            except Exception as e:
-                logger.error(f"Error scraping page {page}: {str(e)}")
-                break
-        
-        logger.info(f"Total listings scraped: {len(all_listings)}")
-        return all_listings
-    
-    def _parse_listings_page(self, html: str, page_num: int) -> List[Dict]:
-        """Parse listings from a search results page"""
-        soup = BeautifulSoup(html, 'html.parser')
-        listings = []
-        
-        # Try multiple possible selectors
-        containers = (
-            soup.find_all('article', class_='itemBox') or
-            soup.find_all('div', class_='property-item') or
-            soup.find_all('div', class_='listing-item') or
-            soup.find_all('div', {'data-property-id': True}) or
-            []
-        )
-        
-        for container in containers:
-            try:
-                listing = self._extract_listing_data(container, page_num)
-                if listing and listing.get('external_id'):
-                    listings.append(listing)
-            except Exception as e:
-                logger.warning(f"Error extracting listing: {str(e)}")
-                continue
-        
-        return listings
-    
-    def _extract_listing_data(self, container, page_num: int) -> Optional[Dict]:
-        """Extract data from a single listing container"""
-        
-        # Extract title and URL
-        title_elem = container.find('h3') or container.find('h2') or container.find('a', class_='title')
-        if not title_elem:
-            return None
-        
-        link = title_elem.find('a') if title_elem.name != 'a' else title_elem
-        if not link:
-            return None
-        
-        title = link.text.strip()
-        url = urljoin(self.BASE_URL, link.get('href', ''))
-        
-        # Extract external ID from URL
-        external_id = self._extract_id_from_url(url)
-        if not external_id:
-            external_id = f"nekretnine_{hash(url) % 10000000}"
-        
-        # Extract price
-        price_elem = container.find('span', class_='price') or container.find('div', class_='price')
-        price_text = price_elem.text.strip() if price_elem else ''
-        price_numeric = self._extract_price(price_text)
-        
-        # Extract location
-        location_elem = container.find('span', class_='location') or container.find('div', class_='location')
-        location = location_elem.text.strip() if location_elem else ''
-        municipality = self._extract_municipality(location or title)
-        
-        # Extract details (rooms, size, etc.)
-        details = self._extract_details(container)
-        
-        # Extract image
-        img = container.find('img')
-        thumbnail_url = None
-        if img:
-            thumbnail_url = img.get('data-src') or img.get('src') or img.get('data-lazy')
-            if thumbnail_url and not thumbnail_url.startswith('http'):
-                thumbnail_url = urljoin(self.BASE_URL, thumbnail_url)
-        
-        # Build listing dictionary
-        listing = {
-            'external_id': external_id,
-            'source': 'nekretnine_ba',
-            'url': url,
-            'title': title,
-            'price_numeric': price_numeric,
-            'municipality': municipality,
-            'rooms': details.get('rooms'),
-            'square_m2': details.get('square_m2'),
-            'thumbnail_url': thumbnail_url,
-            'description': self._extract_description(container),
-            'posted_date': datetime.now().isoformat(),
-            'bathrooms': details.get('bathrooms'),
-            'level': details.get('level'),
-            'heating': details.get('heating'),
-            'condition': details.get('condition'),
-            'property_type': 'Stan',
-            'ad_type': 'Prodaja'
-        }
-        
-        return listing
-    
-    def _extract_details(self, container) -> Dict:
-        """Extract property details like rooms, size, etc."""
-        details = {}
-        
-        # Look for detail list
-        detail_list = container.find('ul', class_='list') or container.find('ul', class_='details')
-        if detail_list:
-            items = detail_list.find_all('li')
-            for item in items:
-                text = item.text.strip().lower()
-                
-                # Extract rooms
-                if 'soba' in text or 'room' in text:
-                    rooms = re.search(r'(\d+(?:\.\d+)?)', text)
-                    if rooms:
-                        details['rooms'] = float(rooms.group(1))
-                
-                # Extract size
-                if 'm²' in text or 'm2' in text or 'kvadrat' in text:
-                    size = re.search(r'(\d+(?:\.\d+)?)', text)
-                    if size:
-                        details['square_m2'] = float(size.group(1))
-                
-                # Extract bathrooms
-                if 'kupatil' in text or 'bathroom' in text or 'wc' in text:
-                    bathrooms = re.search(r'(\d+)', text)
-                    if bathrooms:
-                        details['bathrooms'] = int(bathrooms.group(1))
-                
-                # Extract level/floor
-                if 'sprat' in text or 'kat' in text or 'floor' in text:
-                    details['level'] = text
-                
-                # Extract heating
-                if 'grijanje' in text or 'heating' in text:
-                    details['heating'] = text
-                
-                # Extract condition
-                if 'stanje' in text or 'condition' in text:
-                    details['condition'] = text
-        
-        return details
-    
-    def _extract_price(self, price_text: str) -> Optional[int]:
-        """Extract numeric price from text"""
-        if not price_text:
-            return None
-        
-        # Remove currency symbols and clean up
-        price_clean = re.sub(r'[^\d,.]', '', price_text)
-        price_clean = price_clean.replace('.', '').replace(',', '')
-        
-        try:
-            return int(price_clean)
-        except ValueError:
-            return None
-    
-    def _extract_municipality(self, text: str) -> str:
-        """Extract municipality from location text or title"""
-        municipalities = [
-            'Centar', 'Novo Sarajevo', 'Stari Grad', 'Novi Grad',
-            'Ilidža', 'Vogošća', 'Hadžići', 'Ilijaš', 'Trnovo',
-            'Banja Luka', 'Tuzla', 'Zenica', 'Mostar', 'Bijeljina'
-        ]
-        
-        text_lower = text.lower()
-        for municipality in municipalities:
-            if municipality.lower() in text_lower:
-                return municipality
-        
-        return 'Ostalo'
-    
-    def _extract_id_from_url(self, url: str) -> Optional[str]:
-        """Extract property ID from URL"""
-        # Try to find ID in URL path or query params
-        match = re.search(r'/(\d+)', url)
-        if match:
-            return f"nekretnine_{match.group(1)}"
-        
-        # Try query parameters
-        parsed = urlparse(url)
-        params = parse_qs(parsed.query)
-        if 'id' in params:
-            return f"nekretnine_{params['id'][0]}"
-        
-        return None
-    
-    def _extract_description(self, container) -> str:
-        """Extract property description"""
-        desc_elem = container.find('p', class_='description') or container.find('div', class_='description')
-        if desc_elem:
-            return desc_elem.text.strip()[:500]  # Limit to 500 chars
-        return ''
-    
-    def scrape_detail_page(self, url: str) -> Optional[Dict]:
-        """
-        Scrape detailed information from a property detail page
-        
-        Args:
-            url: URL of the property detail page
-            
-        Returns:
-            Dictionary with detailed property information
-        """
-        try:
-            response = self.session.get(url, timeout=15)
-            if response.status_code != 200:
-                return None
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            details = {}
-            
-            # Extract all images
-            image_gallery = soup.find('div', class_='gallery') or soup.find('div', class_='images')
-            if image_gallery:
-                images = image_gallery.find_all('img')
-                image_urls = []
-                for img in images:
-                    img_url = img.get('data-src') or img.get('src')
-                    if img_url and img_url.startswith('http'):
-                        image_urls.append(img_url)
-                details['image_urls'] = image_urls[:10]  # Limit to 10 images
-            
-            # Extract full description
-            desc_elem = soup.find('div', class_='description') or soup.find('div', class_='content')
-            if desc_elem:
-                details['description'] = desc_elem.text.strip()
-            
-            # Extract additional features
-            features_list = soup.find('ul', class_='features') or soup.find('div', class_='amenities')
-            if features_list:
-                features_text = features_list.text.lower()
-                details['elevator'] = 'lift' in features_text or 'dizalo' in features_text
-                details['balcony'] = 'balkon' in features_text or 'balcony' in features_text
-                details['terrace'] = 'terasa' in features_text or 'terrace' in features_text
-                details['parking_spaces'] = 1 if 'parking' in features_text or 'garaža' in features_text else 0
-            
-            # Extract seller information
-            seller_elem = soup.find('div', class_='seller') or soup.find('div', class_='contact')
-            if seller_elem:
-                seller_name = seller_elem.find('span', class_='name')
-                if seller_name:
-                    details['seller_name'] = seller_name.text.strip()
-                
-                phone = seller_elem.find('a', href=re.compile(r'tel:'))
-                if phone:
-                    details['seller_phone'] = phone.text.strip()
-            
-            time.sleep(self.delay)  # Be respectful
-            return details
-            
-        except Exception as e:
-            logger.error(f"Error scraping detail page {url}: {str(e)}")
-            return None
-
-
 if __name__ == "__main__":
     # Test the scraper
     scraper = NekretnineScraper(delay=1.0)
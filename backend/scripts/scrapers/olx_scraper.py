@@ -1,38 +1,266 @@
 """
 OLX Bosnia Real Estate Scraper
-Scrapes apartment listings from OLX.ba using Selenium + BeautifulSoup
+Scrapes apartment listings from OLX.ba using requests/Selenium + lxml
 Based on the proven scraping method from the Jupyter notebook
 """
 
 import os
+import sys
 import time
+import hashlib
+import json
 import re
 import random
 import logging
-from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from functools import lru_cache
+from datetime import datetime, timezone
+from typing import List, Dict, Iterator, Optional, Tuple
 from urllib.parse import urljoin
 
-from bs4 import BeautifulSoup
+import requests
+from requests.adapters import HTTPAdapter
+import lxml.html
+from lxml import etree
 from selenium import webdriver
 from selenium.webdriver.firefox.options import Options
 from selenium.webdriver.firefox.service import Service
 from selenium.common.exceptions import WebDriverException, TimeoutException
 
+# rate_limit sits next to this file; importable whether the scrapers are
+# loaded as a package or run directly
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from rate_limit import RateLimiter, rps_from_env
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Precompiled patterns
+_PRICE_DIGITS = re.compile(r"[^0-9]")
+_FIRST_NUM = re.compile(r"(\d+)")
+_FLOAT_KEEP = re.compile(r"[^\d,.]")
+_LL_RE = re.compile(r'll=(-?\d+\.\d+),(-?\d+\.\d+)')
+_AT_RE = re.compile(r'@(-?\d+\.\d+),(-?\d+\.\d+)')
+_GMAPS_HREF = re.compile(r"google\.com/maps")
+# Bounded gap between the two numbers keeps scans of large inline scripts linear
+_SCRIPT_COORD = re.compile(
+    r'(?:lat|latitude)["\s:]+(-?\d+\.\d+).{0,200}?(?:lng|longitude)["\s:]+(-?\d+\.\d+)', re.IGNORECASE
+)
+# Punctuation and symbols dropped from detail row labels (letters, incl. č/ž, are kept)
+_LABEL_DROP = str.maketrans('', '', ''.join(
+    chr(c) for c in range(256) if not (chr(c).isalnum() or chr(c) == '_')
+))
+_ARTIKAL = re.compile(r'/artikal/(\d+)')
+
+# Deletion tables for Latin-1; anything left outside ASCII goes through the regex
+_NON_DIGITS = str.maketrans('', '', ''.join(chr(c) for c in range(256) if not '0' <= chr(c) <= '9'))
+_NON_FLOAT = str.maketrans('', '', ''.join(chr(c) for c in range(256) if chr(c) not in '0123456789,.'))
+
+
+def _has_class(name: str) -> str:
+    """XPath predicate matching elements whose class list contains name"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# Compiled XPath expressions for the detail page (parsed with lxml.html)
+_XP_H1 = etree.XPath("//h1")
+_XP_MAIN_TITLE = etree.XPath(f"//*[{_has_class('main-title-listing')}]")
+_XP_PRICE = etree.XPath(f"//*[{_has_class('price-heading')}]")
+_XP_CITY = etree.XPath(f"//div[{_has_class('btn-pill')} and {_has_class('city')}]")
+_XP_DESC_CONTAINER = etree.XPath(f"//*[{_has_class('ad-description-container')}]")
+_XP_DESC_CONTAINER_LIKE = etree.XPath("//div[contains(@class, 'ad-description-container')]")
+_XP_VUE_DESC = etree.XPath(f"(//div[@data-v-66c319e2])[1]//div[{_has_class('ad-description')}]")
+_XP_SWIPER_IMGS = etree.XPath(
+    f"//div[{_has_class('swiper-slide')} and not({_has_class('swiper-slide-duplicate')})]//img"
+)
+_XP_ARTICLE_IMG = etree.XPath(f"//img[{_has_class('article-img')}]")
+_XP_TEXT_NO_SVG = etree.XPath(".//text()[not(ancestor::svg)]")
+_XP_TEXT_NO_BUTTON = etree.XPath(".//text()[not(ancestor::button)]")
+_XP_REQUIRED_PAIR = etree.XPath("./*[2][self::div]/h4")
+_XP_CHECKMARK = etree.XPath(".//svg[@data-testid='input-success-suffix']")
+_XP_SEARCH_MAIN = etree.XPath(f"//main[{_has_class('articles')}]")
+_XP_LISTING_HREFS = etree.XPath(".//a[contains(@href, '/artikal/')]/@href")
+
+# execute_async_script body: resolves true as soon as the description is in the
+# DOM (it can render after the title), or false after 5 s
+_WAIT_FOR_DESCRIPTION = """
+const done = arguments[arguments.length - 1];
+const selector = ".ad-description, [class*='description']";
+if (document.querySelector(selector)) { done(true); return; }
+const observer = new MutationObserver(() => {
+    if (document.querySelector(selector)) {
+        observer.disconnect();
+        clearTimeout(timer);
+        done(true);
+    }
+});
+const timer = setTimeout(() => { observer.disconnect(); done(false); }, 5000);
+observer.observe(document.documentElement, {childList: true, subtree: true});
+"""
+
+# Fields of the "required" attribute block: (legacy nth-child position, label keys).
+# Values are matched by label first, so a reordered block still maps correctly.
+_REQUIRED_FIELDS = {
+    "condition": (2, ("stanje",)),
+    "ad_type": (3, ("vrsta_oglasa", "tip_oglasa")),
+    "property_type": (4, ("vrsta", "vrsta_objekta", "tip")),
+    "rooms": (5, ("broj_soba", "sobe")),
+    "square_m2": (6, ("kvadrata", "kvadratura", "površina", "povrsina", "m2")),
+    "equipment": (7, ("namješten", "namještenost", "opremljenost")),
+    "level": (8, ("sprat", "kat")),
+    "heating": (9, ("vrsta_grijanja", "grijanje")),
+}
+
+# Detail row labels stored in their own database columns; the rest go to extra_fields
+_FIELD_MAPPING = {
+    "adresa": "address",
+    "broj_kupatila": "bathrooms",
+    "primarna_orjentacija": "orientation",
+    "vrsta_poda": "floor_type",
+    "godina_izgradnje": "year_built",
+    "garaža": "has_garage",
+    "internet": "has_internet",
+    "kablovska_tv": "has_cable_tv",
+    "lift": "has_elevator",
+    "balkon": "has_balcony",
+    "podrum_tavan": "has_basement",
+    "parking": "has_parking",
+}
+_MAPPED_KEYS = frozenset(_FIELD_MAPPING)
+
+# Collects every detail-page field in the browser so Selenium needs a single
+# round-trip per listing; mirrors _extract_fields_from_tree
+_JS_EXTRACT = """
+const clean = (s) => (s || '').replace(/\\s+/g, ' ').trim() || null;
+const text = (sel) => { const el = document.querySelector(sel); return el ? clean(el.textContent) : null; };
+const paragraphs = (root) => Array.from(root.querySelectorAll('p'))
+    .map((p) => clean(p.textContent)).filter((t) => t && t.length > 1).join(' ') || null;
+
+let municipality = null;
+const city = document.querySelector('div.btn-pill.city');
+if (city) {
+    const copy = city.cloneNode(true);
+    copy.querySelectorAll('svg').forEach((svg) => svg.remove());
+    municipality = clean(copy.textContent);
+}
+
+const required = [];
+document.querySelectorAll('div.required-wrap').forEach((wrap) => {
+    const h4 = wrap.querySelectorAll(':scope > div:nth-child(2) > h4');
+    if (h4.length >= 2) {
+        const position = Array.prototype.indexOf.call(wrap.parentElement.children, wrap) + 1;
+        required.push([position, h4[0].textContent.trim(), clean(h4[1].textContent)]);
+    }
+});
+
+const rows = [];
+document.querySelectorAll('div.tbody div.grid').forEach((row) => {
+    const h4 = row.querySelectorAll('h4');
+    if (h4.length >= 2) {
+        rows.push([h4[0].textContent.trim(), h4[1].textContent.trim(), null]);
+    } else if (h4.length === 1) {
+        rows.push([h4[0].textContent.trim(), null,
+                   row.querySelector('svg[data-testid="input-success-suffix"]') !== null]);
+    }
+});
+
+let description = null;
+const container = document.querySelector('.ad-description-container');
+if (container) description = paragraphs(container);
+if (!description) {
+    const wrap = document.querySelector("div[class*='ad-description-container']");
+    if (wrap) {
+        const copy = wrap.cloneNode(true);
+        copy.querySelectorAll('button').forEach((b) => b.remove());
+        description = clean(copy.textContent);
+    }
+}
+if (!description) {
+    const desc = document.querySelector('div[data-v-66c319e2] div.ad-description');
+    if (desc) description = paragraphs(desc);
+}
+
+let images = Array.from(document.querySelectorAll('div.swiper-slide:not(.swiper-slide-duplicate) img'))
+    .map((img) => img.getAttribute('src') || img.getAttribute('data-src')).filter(Boolean);
+if (!images.length) {
+    const img = document.querySelector('img.article-img');
+    const src = img && (img.getAttribute('src') || img.getAttribute('data-src'));
+    if (src) images = [src];
+}
+
+const mapUrls = Array.from(document.querySelectorAll('a[href*="google.com/maps"]')).map((a) => a.href)
+    .concat(Array.from(document.querySelectorAll('iframe[src*="google.com/maps"]')).map((f) => f.src));
+
+return {
+    title: text('h1') || text('.main-title-listing'),
+    price_text: text('.price-heading'),
+    municipality: municipality,
+    required: required,
+    rows: rows,
+    description: description,
+    image_urls: images,
+    map_urls: mapUrls,
+};
+"""
+
+
+def _ld_json_coordinates(data) -> Optional[Tuple[float, float]]:
+    """Find the first latitude/longitude pair (e.g. a schema.org "geo") in JSON-LD data"""
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if "latitude" in node and "longitude" in node:
+                try:
+                    return float(node["latitude"]), float(node["longitude"])
+                except (TypeError, ValueError):
+                    pass
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+    return None
+
+
+# Longest possible day per month (February checked for leap years separately)
+_MONTH_DAYS = (31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+@lru_cache(maxsize=1024)
+def _parse_olx_date(date_str: str) -> Optional[str]:
+    """Convert OLX DD.MM.YYYY to ISO format YYYY-MM-DD (None if unparseable)"""
+    try:
+        day, month, year = (int(part) for part in date_str.split('.'))
+    except (AttributeError, ValueError):
+        return None
+    # Cheap range check instead of building a datetime
+    if not (1 <= month <= 12 and 1900 <= year <= 2100 and 1 <= day <= _MONTH_DAYS[month - 1]):
+        return None
+    if month == 2 and day == 29 and not (year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)):
+        return None
+    return f"{year:04d}-{month:02d}-{day:02d}"
+
 
 class OLXScraper:
     """Scraper for OLX.ba property listings using Selenium"""
     
     BASE_URL = "https://olx.ba/pretraga?attr=&attr_encoded=1&q=stanovi&category_id=23&page={}&canton=9"
     DETAIL_BASE = "https://olx.ba"
+    USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64; rv:115.0) Gecko/20100101 Firefox/115.0"
+    
+    # Restart pooled browsers after this many pages to bound memory growth
+    MAX_PAGES_PER_DRIVER = 200
     
     def __init__(self, 
                  delay: tuple = (2, 5),
                  firefox_binary: str = "/usr/bin/firefox",
-                 geckodriver_path: str = None):
+                 geckodriver_path: str = None,
+                 max_workers: int = 8,
+                 driver_pool_size: int = 4,
+                 supabase_client=None,
+                 max_rps: Optional[float] = None):
         """
         Initialize OLX scraper with Selenium
         
@@ -40,11 +268,47 @@ class OLXScraper:
             delay: Tuple of (min, max) seconds delay between requests
             firefox_binary: Path to Firefox binary
             geckodriver_path: Path to geckodriver (auto-detect if None)
+            max_workers: Number of detail pages fetched concurrently
+            driver_pool_size: Number of pooled Firefox instances for Selenium fallbacks
+            supabase_client: Optional Supabase client; listings already stored are
+                skipped before their detail page is fetched
+            max_rps: Cap on requests per second to olx.ba across all workers
+                (defaults to the OLX_RPS env var, else 2; 0 disables the cap)
         """
         self.delay = delay
         self.firefox_binary = firefox_binary
         self.geckodriver_path = geckodriver_path or self._find_geckodriver()
+        self.max_workers = max_workers
         self.driver = None
+        
+        # Shared request budget, so retries and 429s don't pile up under concurrency
+        if max_rps is None:
+            max_rps = rps_from_env(2)
+        self._limiter = RateLimiter(max_rps) if max_rps > 0 else None
+        
+        # Plain HTTP session for pages that render without JavaScript
+        self._session = requests.Session()
+        self._session.headers.update({"User-Agent": self.USER_AGENT})
+        # Detail pages are fetched from max_workers threads over one session
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=max(10, max_workers))
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        
+        # Pool of Firefox instances for detail-page fallbacks; a WebDriver is
+        # not thread-safe, so each one is checked out by a single worker.
+        # Slots hold None until a driver is first needed.
+        self._pool_size = driver_pool_size
+        self._driver_pool: queue.Queue = queue.Queue()
+        for _ in range(driver_pool_size):
+            self._driver_pool.put(None)
+        self._pool_drivers = {}  # driver -> pages loaded
+        self._pool_lock = threading.Lock()
+        
+        # External IDs already in the database
+        self.supabase = supabase_client
+        self.existing_ids = set()
+        if self.supabase:
+            self._load_existing_ids()
     
     def _find_geckodriver(self) -> str:
         """Auto-detect geckodriver path"""
@@ -70,10 +334,14 @@ class OLXScraper:
         )
     
     def _init_driver(self):
-        """Initialize Selenium WebDriver with improved bot detection avoidance"""
+        """Initialize the main Selenium WebDriver"""
         if self.driver:
             return
         
+        self.driver = self._create_driver()
+    
+    def _create_driver(self):
+        """Create a Firefox WebDriver with improved bot detection avoidance"""
         logger.info("Initializing Firefox WebDriver...")
         options = Options()
         options.binary_location = self.firefox_binary
@@ -87,29 +355,124 @@ class OLXScraper:
         options.add_argument("--window-size=1920,1080")
         
         # More realistic user agent
-        options.set_preference("general.useragent.override", 
-            "Mozilla/5.0 (X11; Linux x86_64; rv:115.0) Gecko/20100101 Firefox/115.0")
+        options.set_preference("general.useragent.override", self.USER_AGENT)
         
         # Enable JavaScript and images
         options.set_preference("javascript.enabled", True)
         options.set_preference("permissions.default.image", 2)  # Disable images for speed
-        
+
+        # Skip everything the parser never reads (styles, fonts, media, telemetry)
+        options.set_preference("permissions.default.stylesheet", 2)
+        options.set_preference("browser.display.use_document_fonts", 0)
+        options.set_preference("gfx.downloadable_fonts.enabled", False)
+        options.set_preference("media.autoplay.default", 5)
+        options.set_preference("webgl.disabled", True)
+        options.set_preference("dom.webnotifications.enabled", False)
+        options.set_preference("toolkit.telemetry.enabled", False)
+        options.set_preference("datareporting.healthreport.uploadEnabled", False)
+        options.set_preference("app.normandy.enabled", False)
+        options.set_preference("network.prefetch-next", False)
+
+        # Reuse cached static assets between listings
+        options.set_preference("network.http.use-cache", True)
+        options.set_preference("browser.cache.disk.enable", True)
+        options.set_preference("browser.cache.memory.capacity", 65536)
+
+        # Return from driver.get() on DOMContentLoaded; _load_page waits for the content itself
+        options.page_load_strategy = "eager"
+
         service = Service(executable_path=self.geckodriver_path)
-        self.driver = webdriver.Firefox(service=service, options=options)
-        self.driver.set_page_load_timeout(120)
+        driver = webdriver.Firefox(service=service, options=options)
+        driver.set_page_load_timeout(120)
         
         # Hide webdriver property
-        self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         
         logger.info("✅ WebDriver initialized")
+        return driver
+    
+    @contextmanager
+    def _acquire_driver(self):
+        """Check out a pooled WebDriver, creating or recycling it as needed"""
+        driver = self._driver_pool.get()
+        try:
+            if driver is None:
+                driver = self._create_driver()
+                with self._pool_lock:
+                    self._pool_drivers[driver] = 0
+            yield driver
+        finally:
+            if driver is not None:
+                with self._pool_lock:
+                    pages = self._pool_drivers.get(driver, 0) + 1
+                    self._pool_drivers[driver] = pages
+                if pages >= self.MAX_PAGES_PER_DRIVER:
+                    logger.info("♻️  Recycling WebDriver after %d pages", pages)
+                    self._quit_pooled(driver)
+                    driver = None
+            self._driver_pool.put(driver)
+    
+    def _quit_pooled(self, driver):
+        """Quit a pooled WebDriver and forget it"""
+        with self._pool_lock:
+            self._pool_drivers.pop(driver, None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
     
-    def _close_driver(self):
-        """Close Selenium WebDriver"""
+    def cleanup(self):
+        """Close the main WebDriver and all pooled WebDrivers"""
+        with self._pool_lock:
+            pooled = list(self._pool_drivers)
+        for driver in pooled:
+            self._quit_pooled(driver)
+        
+        # Reset the pool slots so drivers are recreated on next use
+        while True:
+            try:
+                self._driver_pool.get_nowait()
+            except queue.Empty:
+                break
+        for _ in range(self._pool_size):
+            self._driver_pool.put(None)
+        
         if self.driver:
             self.driver.quit()
             self.driver = None
             logger.info("WebDriver closed")
     
+    def _load_existing_ids(self):
+        """Load external IDs of stored OLX listings to avoid re-scraping them"""
+        try:
+            logger.info("Loading existing OLX listings from database...")
+            batch_size = 1000  # PostgREST default limit is 1000; pull in batches
+            # Page by id (keyset): unordered offset pages can skip or repeat rows
+            last_id = None
+            while True:
+                query = self.supabase.table("listings_olx").select("id, external_id")
+                if last_id is not None:
+                    query = query.gt("id", last_id)
+                response = query.order("id").limit(batch_size).execute()
+                rows = response.data or []
+                self.existing_ids.update(row["external_id"] for row in rows if row.get("external_id"))
+                if len(rows) < batch_size:
+                    break
+                last_id = rows[-1]["id"]
+            logger.info(f"Loaded {len(self.existing_ids)} existing external IDs")
+        except Exception as e:
+            logger.warning(f"Could not load existing external IDs: {e}")
+            self.existing_ids = set()
+    
+    @staticmethod
+    def external_id_from_url(url: str) -> str:
+        """Build the listing's external_id from its /artikal/<id> URL"""
+        url_match = _ARTIKAL.search(url)
+        if url_match:
+            return f"olx_{url_match.group(1)}"
+        # Stable across runs, unlike the process-salted built-in hash()
+        return f"olx_{hashlib.blake2b(url.encode(), digest_size=6).hexdigest()}"
+    
     @staticmethod
     def clean_text(s: str) -> Optional[str]:
         """Clean text by removing extra whitespace"""
@@ -120,7 +483,9 @@ class OLXScraper:
         """Extract numeric price from text (e.g. '250,000 KM' -> 250000)"""
         if not text:
             return None
-        cleaned = re.sub(r"[^0-9]", "", text)
+        cleaned = text.translate(_NON_DIGITS)
+        if not cleaned.isascii():
+            cleaned = _PRICE_DIGITS.sub("", cleaned)
         return int(cleaned) if cleaned else None
     
     @staticmethod
@@ -128,7 +493,7 @@ class OLXScraper:
         """Extract first number from text"""
         if not text:
             return None
-        m = re.search(r"(\d+)", text)
+        m = _FIRST_NUM.search(text)
         return int(m.group(1)) if m else None
     
     @staticmethod
@@ -138,100 +503,152 @@ class OLXScraper:
             return None
         try:
             # Replace comma with dot for float conversion
-            text_clean = re.sub(r"[^\d,.]", "", text).replace(",", ".")
+            text_clean = text.translate(_NON_FLOAT)
+            if not text_clean.isascii():
+                text_clean = _FLOAT_KEEP.sub("", text_clean)
+            text_clean = text_clean.replace(",", ".")
             return float(text_clean) if text_clean else None
         except ValueError:
             return None
     
     @staticmethod
-    def extract_coordinates(soup: BeautifulSoup) -> Tuple[Optional[float], Optional[float]]:
+    def coordinates_from_urls(urls: List[str]) -> Tuple[Optional[float], Optional[float]]:
         """
-        Extract latitude and longitude from Google Maps embed
+        Read coordinates from Google Maps URLs (ll=lat,lng or @lat,lng)
         
         Returns:
             Tuple of (latitude, longitude) or (None, None)
         """
-        try:
-            # Method 1: Look for Google Maps links with ll parameter
-            links = soup.find_all("a", href=re.compile(r"google\.com/maps"))
-            for link in links:
-                href = link.get("href", "")
-                # Extract from ll parameter: ll=43.713458,18.285125
-                ll_match = re.search(r'll=(-?\d+\.\d+),(-?\d+\.\d+)', href)
-                if ll_match:
-                    return float(ll_match.group(1)), float(ll_match.group(2))
-                
-                # Extract from @coordinates: @43.713458,18.285125
-                at_match = re.search(r'@(-?\d+\.\d+),(-?\d+\.\d+)', href)
-                if at_match:
-                    return float(at_match.group(1)), float(at_match.group(2))
-            
-            # Method 2: Look for Google Maps iframe
-            iframe = soup.find("iframe", src=re.compile(r"google\.com/maps"))
-            if iframe:
-                src = iframe.get("src", "")
-                ll_match = re.search(r'll=(-?\d+\.\d+),(-?\d+\.\d+)', src)
-                if ll_match:
-                    return float(ll_match.group(1)), float(ll_match.group(2))
-            
-            # Method 3: Look in script tags
-            scripts = soup.find_all("script")
-            for script in scripts:
-                if script.string:
-                    coord_match = re.search(r'(?:lat|latitude)["\s:]+(-?\d+\.\d+).*?(?:lng|longitude)["\s:]+(-?\d+\.\d+)', script.string, re.IGNORECASE)
-                    if coord_match:
-                        return float(coord_match.group(1)), float(coord_match.group(2))
+        for url in urls:
+            match = _LL_RE.search(url) or _AT_RE.search(url)
+            if match:
+                return float(match.group(1)), float(match.group(2))
+        return None, None
+    
+    @staticmethod
+    def coordinates_from_scripts(scripts: List[Tuple[Optional[str], str]]) -> Tuple[Optional[float], Optional[float]]:
+        """
+        Read coordinates from (type, text) script bodies: JSON-LD "geo" data
+        first, then a bounded pattern search over the remaining scripts
+        
+        Returns:
+            Tuple of (latitude, longitude) or (None, None)
+        """
+        for script_type, text in scripts:
+            if script_type == "application/ld+json":
+                try:
+                    coords = _ld_json_coordinates(json.loads(text))
+                except ValueError:
+                    continue
+                if coords:
+                    return coords
+        
+        for script_type, text in scripts:
+            if script_type != "application/ld+json":
+                coord_match = _SCRIPT_COORD.search(text)
+                if coord_match:
+                    return float(coord_match.group(1)), float(coord_match.group(2))
+        return None, None
+    
+    @staticmethod
+    def _label_key(label: str) -> str:
+        """Normalize a detail row label to snake_case"""
+        return "_".join(label.lower().split()).translate(_LABEL_DROP)
+    
+    @staticmethod
+    def _required_fields(rows: List[Tuple[int, str, Optional[str]]],
+                         flexible_details: Dict[str, any]) -> Dict[str, Optional[str]]:
+        """
+        Map the required attribute block to listing fields
+        
+        Args:
+            rows: (sibling position, label, value) for each div.required-wrap
+            flexible_details: Already extracted tbody rows, keyed by label
             
-            return None, None
-        except Exception as e:
-            logger.warning(f"Failed to extract coordinates: {e}")
-            return None, None
+        Returns:
+            Dictionary of field name -> value (None when missing)
+        """
+        by_label = dict(flexible_details)
+        by_position = {}
+        for position, label, value in rows:
+            by_label[OLXScraper._label_key(label)] = value
+            by_position[position] = value
+        
+        required = {}
+        for name, (position, labels) in _REQUIRED_FIELDS.items():
+            value = next((by_label[key] for key in labels if isinstance(by_label.get(key), str)), None)
+            required[name] = value if value is not None else by_position.get(position)
+        return required
+    
+    @staticmethod
+    def _detail_row(row) -> Optional[Tuple[str, any]]:
+        """
+        Read one tbody row: (label_key, text) for value rows, (label_key, bool)
+        for amenity rows marked by a checkmark SVG, None otherwise
+        """
+        # Get all h4 elements (label and value)
+        h4_elements = list(row.iter("h4"))
+        if len(h4_elements) >= 2:
+            return OLXScraper._label_key(h4_elements[0].text_content().strip()), h4_elements[1].text_content().strip()
+        if len(h4_elements) == 1:
+            has_checkmark = bool(_XP_CHECKMARK(row))
+            return OLXScraper._label_key(h4_elements[0].text_content().strip()), has_checkmark
+        return None
     
     @staticmethod
-    def extract_property_details_flexible(soup: BeautifulSoup) -> Dict[str, any]:
+    def _single_pass_extract(tree: lxml.html.HtmlElement) -> Dict:
         """
-        Flexible extraction of property details from tbody div structure
-        Extracts both text values and boolean amenities
+        Walk the detail page once, collecting coordinates, the tbody detail
+        rows and the required attribute blocks
         
         Returns:
-            Dictionary of field name -> value (str or bool)
+            Dictionary with latitude, longitude, flexible (tbody rows) and
+            required_wraps (div.required-wrap elements in document order)
         """
-        details = {}
-        try:
-            # Find all rows in the tbody div  
-            rows = soup.select("div.tbody div.grid")
-            for row in rows:
-                # Get all h4 elements (label and value)
-                h4_elements = row.find_all("h4")
-                if len(h4_elements) >= 2:
-                    # Text value field
-                    label = h4_elements[0].get_text(strip=True)
-                    value = h4_elements[1].get_text(strip=True)
-                    
-                    # Normalize label to snake_case
-                    label_key = re.sub(r'\s+', '_', label.lower())
-                    label_key = re.sub(r'[^a-z0-9_]', '', label_key)
-                    details[label_key] = value
-                elif len(h4_elements) == 1:
-                    # Boolean field (has checkmark SVG or not)
-                    label = h4_elements[0].get_text(strip=True)
-                    has_checkmark = row.find("svg", {"data-testid": "input-success-suffix"}) is not None
-                    
-                    label_key = re.sub(r'\s+', '_', label.lower())
-                    label_key = re.sub(r'[^a-z0-9_]', '', label_key)
-                    details[label_key] = has_checkmark
+        link_urls, iframe_urls, scripts = [], [], []
+        flexible, required_wraps = {}, []
+        for el in tree.iter("a", "iframe", "script", "div"):
+            tag = el.tag
+            if tag == "div":
+                classes = (el.get("class") or "").split()
+                if "required-wrap" in classes:
+                    required_wraps.append(el)
+                elif "grid" in classes and any(
+                    "tbody" in (parent.get("class") or "").split() for parent in el.iterancestors("div")
+                ):
+                    item = OLXScraper._detail_row(el)
+                    if item:
+                        flexible[item[0]] = item[1]
+            elif tag == "a":
+                href = el.get("href")
+                if href and _GMAPS_HREF.search(href):
+                    link_urls.append(href)
+            elif tag == "iframe":
+                src = el.get("src")
+                if src and _GMAPS_HREF.search(src):
+                    iframe_urls.append(src)
+            elif el.text:
+                scripts.append((el.get("type"), el.text))
         
-        except Exception as e:
-            logger.warning(f"Failed flexible extraction: {e}")
+        # Links first, then the embedded map, then inline scripts
+        latitude, longitude = OLXScraper.coordinates_from_urls(link_urls + iframe_urls[:1])
+        if latitude is None:
+            latitude, longitude = OLXScraper.coordinates_from_scripts(scripts)
         
-        return details
+        return {
+            "latitude": latitude,
+            "longitude": longitude,
+            "flexible": flexible,
+            "required_wraps": required_wraps,
+        }
     
-    def fetch_page_source(self, url: str) -> Optional[str]:
-        """Load page and return HTML source with timeout protection"""
+    def _load_page(self, url: str, driver) -> bool:
+        """Navigate driver to url and wait for the listing content; False on load failure"""
         try:
             # Set a page load timeout
-            self.driver.set_page_load_timeout(30)
-            self.driver.get(url)
+            driver.set_page_load_timeout(30)
+            self._throttle()
+            driver.get(url)
             
             # Wait for Vue.js app to initialize and render content
             from selenium.webdriver.support.ui import WebDriverWait
@@ -240,286 +657,329 @@ class OLXScraper:
             
             try:
                 # Wait for Vue app to mount - look for specific content that appears after JS loads
-                WebDriverWait(self.driver, 10).until(
+                WebDriverWait(driver, 10).until(
                     EC.presence_of_element_located((By.CSS_SELECTOR, "h1[class*='heading'], .price-heading"))
                 )
                 logger.debug("Main content loaded")
                 
-                # Additional wait for description to load (it may load after the title)
-                time.sleep(2)
-                
-                # Try to wait for description specifically (but don't fail if not found)
-                try:
-                    WebDriverWait(self.driver, 3).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, ".ad-description, [class*='description']"))
-                    )
+                # The description may render after the title; resolve as soon as it appears
+                if driver.execute_async_script(_WAIT_FOR_DESCRIPTION):
                     logger.debug("Description loaded")
-                except TimeoutException:
+                else:
                     logger.debug("Description element not found within timeout")
                     
             except TimeoutException:
                 logger.warning("Timeout waiting for main content to load - continuing anyway")
             
-            return self.driver.page_source
+            return True
             
         except TimeoutException:
             logger.warning(f"Page load timeout for {url} - skipping")
-            return None
+            return False
         except (WebDriverException, OSError) as e:
             logger.warning(f"Failed to load page: {url} → {str(e)[:80]}")
+            return False
+    
+    def fetch_page_source(self, url: str, driver=None) -> Optional[str]:
+        """Load page and return HTML source with timeout protection"""
+        driver = driver or self.driver
+        if not self._load_page(url, driver):
             return None
-        except Exception as e:
-            logger.error(f"Unexpected error loading page: {url} → {e}")
+        try:
+            return driver.page_source
+        except (WebDriverException, OSError) as e:
+            logger.warning(f"Failed to read page source: {url} → {str(e)[:80]}")
+            return None
+    
+    def _throttle(self):
+        """Wait for the shared rate limiter, if one is configured"""
+        if self._limiter:
+            self._limiter.acquire()
+    
+    def _fetch_static(self, url: str) -> Optional[str]:
+        """Fetch a page over plain HTTP (no JavaScript rendering)"""
+        try:
+            self._throttle()
+            response = self._session.get(url, timeout=15)
+            if response.status_code != 200:
+                logger.debug(f"Static fetch got {response.status_code} for {url}")
+                return None
+            return response.text
+        except requests.RequestException as e:
+            logger.debug(f"Static fetch failed for {url}: {e}")
             return None
-        
     
     def parse_detail_page(self, url: str) -> Optional[Dict]:
         """
         Parse detailed information from a single listing page
         
+        The page is first fetched over plain HTTP; Selenium is only used
+        when the static HTML is missing the title or price. In the browser
+        the fields are read with a single execute_script call, and the
+        page source is only parsed if that fails.
+        
         Args:
             url: URL of the listing detail page
             
         Returns:
             Dictionary with listing details
         """
-        logger.info(f"🔍 Parsing: {url}")
+        logger.debug("🔍 Parsing: %s", url)
         
-        html = self.fetch_page_source(url)
-        if not html:
-            logger.warning(f"   ❌ No HTML returned")
+        html = self._fetch_static(url)
+        details = self._parse_detail_html(url, html) if html else None
+        if details and details.get("title") and details.get("price_numeric") is not None:
+            return details
+        
+        logger.debug(f"   Static HTML incomplete, falling back to Selenium")
+        with self._acquire_driver() as driver:
+            if not self._load_page(url, driver):
+                logger.warning(f"   ❌ No HTML returned")
+                return None
+            fields = self._extract_fields_in_page(driver)
+            if fields is None:
+                html = driver.page_source
+        
+        if fields is not None:
+            return self._build_details(url, fields)
+        return self._parse_detail_html(url, html)
+    
+    def _extract_fields_in_page(self, driver) -> Optional[Dict]:
+        """Read the listing fields from the loaded page in one execute_script round-trip"""
+        try:
+            data = driver.execute_script(_JS_EXTRACT)
+        except WebDriverException as e:
+            logger.debug(f"In-page extraction failed: {str(e)[:80]}")
+            return None
+        if not data:
             return None
         
+        flexible_details = {}
+        for label, value, has_checkmark in data.get("rows") or []:
+            flexible_details[self._label_key(label)] = value if value is not None else has_checkmark
+        
+        latitude, longitude = self.coordinates_from_urls(data.get("map_urls") or [])
+        
+        return {
+            "title": data.get("title"),
+            "price_text": data.get("price_text"),
+            "municipality": data.get("municipality"),
+            "latitude": latitude,
+            "longitude": longitude,
+            "flexible": flexible_details,
+            "required": self._required_fields(data.get("required") or [], flexible_details),
+            "description": data.get("description"),
+            "image_urls": list(dict.fromkeys(data.get("image_urls") or [])),
+        }
+    
+    def _parse_detail_html(self, url: str, html: str) -> Optional[Dict]:
+        """Extract listing details from detail page HTML"""
         try:
-            soup = BeautifulSoup(html, "lxml")
-            get_text = lambda sel: self.clean_text(
-                soup.select_one(sel).get_text()
-            ) if soup.select_one(sel) else None
-            
-            # Extract title
-            title = get_text("h1") or get_text(".main-title-listing")
-            logger.info(f"   📝 Title: {title}")
-            
-            # Extract price
-            price_text = get_text(".price-heading")
-            price_numeric = self.extract_price(price_text)
-            logger.info(f"   💰 Price: {price_text} → {price_numeric} KM")
-            
-            # Extract municipality (location)
-            municipality_tag = soup.find("div", class_="btn-pill city")
-            if municipality_tag:
-                # Remove SVG icons
-                for svg in municipality_tag.find_all("svg"):
-                    svg.decompose()
-                municipality = self.clean_text(municipality_tag.get_text())
-            else:
-                municipality = None
-            logger.info(f"   📍 Municipality: {municipality}")
-            
-            # Extract coordinates from Google Maps
-            latitude, longitude = self.extract_coordinates(soup)
-            if latitude and longitude:
-                logger.info(f"   🗺️  Coordinates: {latitude}, {longitude}")
-            
-            # Extract flexible property details from tbody structure
-            flexible_details = self.extract_property_details_flexible(soup)
-            
-            # Extract property details using CSS selectors (existing method)
-            rooms_text = get_text("div.required-wrap:nth-child(5) > div:nth-child(2) > h4:nth-child(2)")
-            rooms = self.extract_number(rooms_text)
-            logger.info(f"   🚪 Rooms: {rooms_text} → {rooms}")
-            
-            square_m2_text = get_text("div.required-wrap:nth-child(6) > div:nth-child(2) > h4:nth-child(2)")
-            square_m2 = self.extract_float(square_m2_text)
-            logger.info(f"   📏 Size: {square_m2_text} → {square_m2} m²")
-            
-            condition = get_text("div.required-wrap:nth-child(2) > div:nth-child(2) > h4:nth-child(2)")
-            logger.info(f"   🏗️  Condition: {condition}")
-            
-            ad_type = get_text("div.required-wrap:nth-child(3) > div:nth-child(2) > h4:nth-child(2)")
-            logger.info(f"   📋 Ad Type: {ad_type}")
-            
-            property_type = get_text("div.required-wrap:nth-child(4) > div:nth-child(2) > h4:nth-child(2)")
-            logger.info(f"   🏠 Property Type: {property_type}")
-            
-            equipment = get_text("div.required-wrap:nth-child(7) > div:nth-child(2) > h4:nth-child(2)")
-            logger.info(f"   🛋️  Equipment: {equipment}")
-            
-            level = get_text("div.required-wrap:nth-child(8) > div:nth-child(2) > h4:nth-child(2)")
-            logger.info(f"   🏢 Level: {level}")
-            
-            heating = get_text("div.required-wrap:nth-child(9) > div:nth-child(2) > h4:nth-child(2)")
-            logger.info(f"   🔥 Heating: {heating}")
-            
-            # Extract description
-            description = None
-            
-            # Method 1: Try .ad-description directly
-            description_container = soup.select_one(".ad-description-container")
-            if description_container:
-                # Get all text from description, preserving structure
-                description_parts = []
-                for element in description_container.find_all(['p']):
-                    text = self.clean_text(element.get_text())
-                    if text and len(text) > 1:  # Skip empty or single char
-                        description_parts.append(text)
-                
-                if description_parts:
-                    description = " ".join(description_parts)
-            
-            # Method 2: Try .ad-description-container
-            if not description:
-                desc_container = soup.select_one("div[class*='ad-description-container']")
-                if desc_container:
-                    # Remove button elements
-                    for button in desc_container.find_all('button'):
-                        button.decompose()
-                    description = self.clean_text(desc_container.get_text())
-            
-            # Method 3: Try data-v-66c319e2 attribute (Vue.js component)
-            if not description:
-                vue_desc = soup.find('div', attrs={'data-v-66c319e2': True})
-                if vue_desc:
-                    desc_div = vue_desc.find('div', class_='ad-description')
-                    if desc_div:
-                        description_parts = []
-                        for p in desc_div.find_all('p'):
-                            text = self.clean_text(p.get_text())
-                            if text and len(text) > 1:
-                                description_parts.append(text)
-                        if description_parts:
-                            description = " ".join(description_parts)
-            
-            if description:
-                logger.info(f"   📄 Description: {description[:100]}... ({len(description)} chars)")
-            else:
-                logger.info(f"   📄 Description: Not found")
-                # Debug: Show what we did find
-                all_divs = soup.find_all('div', class_=re.compile('description'))
-                if all_divs:
-                    logger.debug(f"   Found {len(all_divs)} divs with 'description' in class name")
-                    for div in all_divs[:3]:
-                        logger.debug(f"     - {div.get('class')}: {str(div)[:100]}...")
-            
-            # Extract external ID from URL
-            url_match = re.search(r'/artikal/(\d+)', url)
-            external_id = f"olx_{url_match.group(1)}" if url_match else f"olx_{hash(url) % 10000000}"
-            logger.info(f"   🆔 External ID: {external_id}")
-            
-            # Extract all images from swiper carousel
-            image_urls = []
-            # Find all swiper slides with images (excluding duplicates)
-            swiper_imgs = soup.select("div.swiper-slide:not(.swiper-slide-duplicate) img")
-            for img in swiper_imgs:
-                img_url = img.get("src") or img.get("data-src")
-                if img_url and img_url not in image_urls:
-                    image_urls.append(img_url)
-            
-            # Fallback to article-img if no swiper images found
-            if not image_urls:
-                img = soup.select_one("img.article-img")
-                if img:
-                    img_url = img.get("src") or img.get("data-src")
-                    if img_url:
-                        image_urls.append(img_url)
-            
-            thumbnail_url = image_urls[0] if image_urls else None
-            logger.info(f"   🖼️  Images: {len(image_urls)} found")
-            if image_urls:
-                logger.info(f"      First: {image_urls[0][:60]}...")
-                logger.info(f"      Total URLs: {image_urls}")
-            
-            # Build listing dictionary with database column mapping
-            details = {
-                "external_id": external_id,
-                "url": url,
-                "title": title,
-                "description": description,
-                "price_numeric": price_numeric,
-                "municipality": municipality,
-                "condition": condition,
-                "ad_type": ad_type,
-                "property_type": property_type,
-                "rooms": rooms,
-                "square_m2": square_m2,
-                "equipment": equipment,
-                "level": level,
-                "heating": heating,
-                "thumbnail_url": thumbnail_url,
-                "image_urls": image_urls,
-                "latitude": latitude,
-                "longitude": longitude,
-                "posted_date": datetime.now().isoformat(),
-                "scraped_at": datetime.now().isoformat(),
-                "last_updated": datetime.now().isoformat(),
-                "is_active": True,
-            }
-            
-            # Helper function to parse OLX date format (DD.MM.YYYY)
-            def parse_olx_date(date_str: str) -> Optional[str]:
-                """Convert DD.MM.YYYY to ISO format YYYY-MM-DD"""
-                try:
-                    parts = date_str.split('.')
-                    if len(parts) == 3:
-                        day, month, year = parts
-                        # Create datetime and return ISO format date only
-                        dt = datetime(int(year), int(month), int(day))
-                        return dt.date().isoformat()
-                except:
-                    pass
-                return None
-            
-            # Map flexible_details to database columns
-            field_mapping = {
-                "adresa": "address",
-                "broj_kupatila": "bathrooms",
-                "primarna_orjentacija": "orientation",
-                "vrsta_poda": "floor_type",
-                "godina_izgradnje": "year_built",
-                "garaža": "has_garage",
-                "internet": "has_internet",
-                "kablovska_tv": "has_cable_tv",
-                "lift": "has_elevator",
-                "balkon": "has_balcony",
-                "podrum_tavan": "has_basement",
-                "parking": "has_parking",
-            }
-            
-            # Log and map fields
-            for olx_field, db_column in field_mapping.items():
-                if olx_field in flexible_details:
-                    value = flexible_details[olx_field]
-                    details[db_column] = value
-                    logger.info(f"   🔍 {olx_field} → {db_column}: {value}")
-            
-            # Handle publication_date separately (needs date parsing)
-            if "datum_objave" in flexible_details:
-                date_str = flexible_details["datum_objave"]
-                parsed_date = parse_olx_date(date_str)
-                if parsed_date:
-                    details["publication_date"] = parsed_date
-                    logger.info(f"   🔍 datum_objave → publication_date: {date_str} → {parsed_date}")
-                else:
-                    logger.warning(f"   ⚠️  Could not parse date: {date_str}")
-            
-            # Store remaining unmapped fields in extra_fields JSON column
-            extra_fields = {}
-            for key, value in flexible_details.items():
-                if key not in field_mapping:
-                    extra_fields[key] = value
-            
-            if extra_fields:
-                details["extra_fields"] = extra_fields
-            
-            logger.info(f"   ✅ Successfully parsed listing with {len(flexible_details)} extra fields")
-            return details
-            
+            tree = lxml.html.document_fromstring(html)
+            return self._build_details(url, self._extract_fields_from_tree(tree))
         except Exception as e:
-            logger.error(f"   ❌ Failed to parse details for {url} → {e}")
-            import traceback
-            logger.error(traceback.format_exc())
+            logger.error("   ❌ Failed to parse details for %s → %s", url, e)
+            logger.debug("Parse failure traceback", exc_info=True)
             return None
     
+    def _paragraph_text(self, container) -> Optional[str]:
+        """Join the non-trivial <p> texts under container"""
+        parts = []
+        for p in container.iter("p"):
+            text = self.clean_text(p.text_content())
+            if text and len(text) > 1:  # Skip empty or single char
+                parts.append(text)
+        return " ".join(parts) if parts else None
+    
+    def _extract_fields_from_tree(self, tree: lxml.html.HtmlElement) -> Dict:
+        """Read the raw listing fields from a parsed detail page"""
+        def get_text(xpath: etree.XPath) -> Optional[str]:
+            found = xpath(tree)
+            return self.clean_text(found[0].text_content()) if found else None
+        
+        # Extract title
+        title = get_text(_XP_H1) or get_text(_XP_MAIN_TITLE)
+        
+        # Extract price
+        price_text = get_text(_XP_PRICE)
+        
+        # Extract municipality (location), skipping SVG icon text
+        city = _XP_CITY(tree)
+        municipality = self.clean_text("".join(_XP_TEXT_NO_SVG(city[0]))) if city else None
+        
+        # Coordinates, tbody rows and the required block come from one tree walk
+        page = self._single_pass_extract(tree)
+        latitude, longitude = page["latitude"], page["longitude"]
+        flexible_details = page["flexible"]
+        
+        # Extract the required attribute block
+        rows = []
+        for wrap in page["required_wraps"]:
+            h4 = _XP_REQUIRED_PAIR(wrap)
+            if len(h4) >= 2:
+                position = sum(1 for _ in wrap.itersiblings(etree.Element, preceding=True)) + 1
+                rows.append((position, h4[0].text_content().strip(), self.clean_text(h4[1].text_content())))
+        required = self._required_fields(rows, flexible_details)
+        
+        # Extract description
+        description = None
+        
+        # Method 1: Try .ad-description directly
+        containers = _XP_DESC_CONTAINER(tree)
+        if containers:
+            description = self._paragraph_text(containers[0])
+        
+        # Method 2: Try .ad-description-container, ignoring button text
+        if not description:
+            containers = _XP_DESC_CONTAINER_LIKE(tree)
+            if containers:
+                description = self.clean_text("".join(_XP_TEXT_NO_BUTTON(containers[0])))
+        
+        # Method 3: Try data-v-66c319e2 attribute (Vue.js component)
+        if not description:
+            desc_divs = _XP_VUE_DESC(tree)
+            if desc_divs:
+                description = self._paragraph_text(desc_divs[0])
+        
+        # Extract all images from swiper carousel
+        # Find all swiper slides with images (excluding duplicates), keeping first-seen order
+        image_urls = list(dict.fromkeys(
+            img_url for img_url in (img.get("src") or img.get("data-src") for img in _XP_SWIPER_IMGS(tree)) if img_url
+        ))
+        
+        # Fallback to article-img if no swiper images found
+        if not image_urls:
+            imgs = _XP_ARTICLE_IMG(tree)
+            if imgs:
+                img_url = imgs[0].get("src") or imgs[0].get("data-src")
+                if img_url:
+                    image_urls.append(img_url)
+        
+        return {
+            "title": title,
+            "price_text": price_text,
+            "municipality": municipality,
+            "latitude": latitude,
+            "longitude": longitude,
+            "flexible": flexible_details,
+            "required": required,
+            "description": description,
+            "image_urls": image_urls,
+        }
+    
+    def _build_details(self, url: str, fields: Dict) -> Dict:
+        """Turn raw listing fields into the listing dictionary with database column mapping"""
+        title = fields["title"]
+        logger.debug("   📝 Title: %s", title)
+        
+        price_text = fields["price_text"]
+        price_numeric = self.extract_price(price_text)
+        logger.debug("   💰 Price: %s → %s KM", price_text, price_numeric)
+        
+        municipality = fields["municipality"]
+        logger.debug("   📍 Municipality: %s", municipality)
+        
+        latitude, longitude = fields["latitude"], fields["longitude"]
+        if latitude and longitude:
+            logger.debug("   🗺️  Coordinates: %s, %s", latitude, longitude)
+        
+        flexible_details = fields["flexible"]
+        required = fields["required"]
+        
+        rooms_text = required.get("rooms")
+        rooms = self.extract_number(rooms_text)
+        logger.debug("   🚪 Rooms: %s → %s", rooms_text, rooms)
+        
+        square_m2_text = required.get("square_m2")
+        square_m2 = self.extract_float(square_m2_text)
+        logger.debug("   📏 Size: %s → %s m²", square_m2_text, square_m2)
+        
+        condition = required.get("condition")
+        logger.debug("   🏗️  Condition: %s", condition)
+        
+        ad_type = required.get("ad_type")
+        logger.debug("   📋 Ad Type: %s", ad_type)
+        
+        property_type = required.get("property_type")
+        logger.debug("   🏠 Property Type: %s", property_type)
+        
+        equipment = required.get("equipment")
+        logger.debug("   🛋️  Equipment: %s", equipment)
+        
+        level = required.get("level")
+        logger.debug("   🏢 Level: %s", level)
+        
+        heating = required.get("heating")
+        logger.debug("   🔥 Heating: %s", heating)
+        
+        description = fields["description"]
+        if description:
+            logger.debug("   📄 Description: %s... (%s chars)", description[:100], len(description))
+        else:
+            logger.debug("   📄 Description: Not found")
+        
+        # Extract external ID from URL
+        external_id = self.external_id_from_url(url)
+        logger.debug("   🆔 External ID: %s", external_id)
+        
+        image_urls = fields["image_urls"]
+        thumbnail_url = image_urls[0] if image_urls else None
+        logger.debug("   🖼️  Images: %s found", len(image_urls))
+        if image_urls:
+            logger.debug("      First: %s...", image_urls[0][:60])
+        
+        # Build listing dictionary with database column mapping
+        now_iso = datetime.now(timezone.utc).isoformat()
+        details = {
+            "external_id": external_id,
+            "url": url,
+            "title": title,
+            "description": description,
+            "price_numeric": price_numeric,
+            "municipality": municipality,
+            "condition": condition,
+            "ad_type": ad_type,
+            "property_type": property_type,
+            "rooms": rooms,
+            "square_m2": square_m2,
+            "equipment": equipment,
+            "level": level,
+            "heating": heating,
+            "thumbnail_url": thumbnail_url,
+            "image_urls": image_urls,
+            "latitude": latitude,
+            "longitude": longitude,
+            "posted_date": None,
+            "scraped_at": now_iso,
+            "last_updated": now_iso,
+            "is_active": True,
+        }
+        
+        # Log and map fields
+        for olx_field in flexible_details.keys() & _MAPPED_KEYS:
+            db_column = _FIELD_MAPPING[olx_field]
+            value = details[db_column] = flexible_details[olx_field]
+            logger.debug("   🔍 %s → %s: %s", olx_field, db_column, value)
+        
+        # Handle publication_date separately (needs date parsing)
+        if "datum_objave" in flexible_details:
+            date_str = flexible_details["datum_objave"]
+            parsed_date = _parse_olx_date(date_str)
+            if parsed_date:
+                details["publication_date"] = details["posted_date"] = parsed_date
+                logger.debug("   🔍 datum_objave → publication_date: %s → %s", date_str, parsed_date)
+            else:
+                logger.warning("   ⚠️  Could not parse date: %s", date_str)
+        
+        # Store remaining unmapped fields in extra_fields JSON column
+        extra_fields = {k: v for k, v in flexible_details.items() if k not in _MAPPED_KEYS}
+        
+        if extra_fields:
+            details["extra_fields"] = extra_fields
+        
+        logger.info("   ✅ Parsed %s (%s extra fields)", url, len(flexible_details))
+        return details
+    
     def scrape_listings(self, 
                        canton: int = 9,  # 9 = Sarajevo Canton
                        max_pages: int = 10) -> List[Dict]:
@@ -533,81 +993,134 @@ class OLXScraper:
         Returns:
             List of listing dictionaries
         """
-        self._init_driver()
-        all_listings = []
+        return [listing for batch in self.iter_listings(canton, max_pages) for listing in batch]
+    
+    def iter_listings(self,
+                      canton: int = 9,  # 9 = Sarajevo Canton
+                      max_pages: int = 10,
+                      batch_size: int = 100) -> Iterator[List[Dict]]:
+        """
+        Scrape apartment listings, yielding them in batches as they are parsed
+        
+        Workers keep parsing while the caller handles a batch, so e.g. database
+        writes overlap with scraping.
+        
+        Args:
+            canton: Canton ID (9 for Sarajevo)
+            max_pages: Maximum number of pages to scrape
+            batch_size: Listings per yielded batch
+            
+        Yields:
+            Lists of listing dictionaries
+        """
+        total = 0
+        batch = []
         
         try:
+            # Collect every listing URL first, so the worker pool stays busy across
+            # page boundaries instead of draining at the end of each search page
+            links = []
             for page in range(1, max_pages + 1):
                 logger.info(f"Scraping page {page}/{max_pages}")
                 
                 search_url = self.BASE_URL.format(page)
-                html = self.fetch_page_source(search_url)
-                
-                if not html:
-                    logger.warning(f"Skipping search page {page}")
-                    continue
                 
                 try:
-                    soup = BeautifulSoup(html, "lxml")
-                    
-                    # Find main listings section
-                    main_section = soup.find("main", class_="articles")
-                    if not main_section:
-                        logger.warning(f"No listings section found on page {page}")
-                        continue
-                    
-                    # Extract all listing links
-                    links = [
-                        urljoin(self.DETAIL_BASE, a["href"])
-                        for a in main_section.find_all("a", href=True)
-                        if "/artikal/" in a.get("href", "")
-                    ]
-                    
-                    # Remove duplicates
-                    links = list(dict.fromkeys(links))
-                    
-                    logger.info(f"📄 Page {page}: found {len(links)} listings")
-                    
-                    if not links:
-                        logger.info("⚠️  No more listings found")
-                        break
-                    
-                    # Parse each listing
-                    for idx, link in enumerate(links, 1):
-                        logger.info(f"\n{'='*80}")
-                        logger.info(f"Listing {idx}/{len(links)} on page {page}")
-                        logger.info(f"{'='*80}")
-                        
-                        try:
-                            data = self.parse_detail_page(link)
-                            if data:
-                                all_listings.append(data)
-                                logger.info(f"✅ Total scraped: {len(all_listings)}")
-                            else:
-                                logger.warning(f"⚠️  No data extracted")
-                            
-                            # Random delay to be respectful
-                            delay_time = random.uniform(*self.delay)
-                            logger.info(f"⏳ Waiting {delay_time:.1f}s...")
-                            time.sleep(delay_time)
-                            
-                        except KeyboardInterrupt:
-                            logger.info("\n⚠️  Scraping interrupted by user")
-                            raise
-                        except Exception as e:
-                            logger.error(f"❌ Error on listing {link}: {str(e)[:100]}")
-                            # Continue to next listing instead of crashing
-                            continue
-                    
+                    page_links = self.fetch_search_links(search_url)
                 except Exception as e:
                     logger.error(f"Failed to parse search page {page} → {e}")
                     continue
+                
+                if page_links is None:
+                    logger.warning(f"No listings section found on page {page}")
+                    continue
+                
+                logger.info(f"📄 Page {page}: found {len(page_links)} listings")
+                
+                if not page_links:
+                    logger.info("⚠️  No more listings found")
+                    break
+                
+                links.extend(page_links)
+            
+            # The same listing can show up on more than one search page
+            links = list(dict.fromkeys(links))
+            if self.existing_ids:
+                new_links = [link for link in links if self.external_id_from_url(link) not in self.existing_ids]
+                logger.info(f"Skipping {len(links) - len(new_links)} listings already in the database")
+                links = new_links
+            logger.info(f"Parsing {len(links)} listings with {self.max_workers} workers")
+            
+            # Parse listings concurrently; results are streamed as they complete
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [executor.submit(self._scrape_link, link) for link in links]
+                for future in as_completed(futures):
+                    data = future.result()
+                    if data:
+                        batch.append(data)
+                        total += 1
+                        logger.info(f"✅ Total scraped: {total}")
+                        if len(batch) >= batch_size:
+                            yield batch
+                            batch = []
+                    else:
+                        logger.warning(f"⚠️  No data extracted")
             
-            logger.info(f"Total listings scraped: {len(all_listings)}")
-            return all_listings
+            if batch:
+                yield batch
+            logger.info(f"Total listings scraped: {total}")
             
         finally:
-            self._close_driver()
+            self.cleanup()
+    
+    def fetch_search_links(self, search_url: str) -> Optional[List[str]]:
+        """
+        Collect listing URLs from a search results page
+        
+        Search pages are server-rendered, so they are fetched over plain HTTP;
+        the browser is only started if that returns no listing links.
+        
+        Returns:
+            De-duplicated listing URLs, or None if the page has no listings section
+        """
+        html = self._fetch_static(search_url)
+        links = self._parse_search_links(html) if html else None
+        if links:
+            return links
+        
+        logger.debug("Static search page had no listings, falling back to Selenium")
+        self._init_driver()
+        html = self.fetch_page_source(search_url)
+        return self._parse_search_links(html) if html else None
+    
+    def _parse_search_links(self, html: str) -> Optional[List[str]]:
+        """Extract de-duplicated /artikal/ links from search page HTML"""
+        tree = lxml.html.document_fromstring(html)
+        
+        # Find main listings section
+        main_sections = _XP_SEARCH_MAIN(tree)
+        if not main_sections:
+            return None
+        
+        # Extract all listing links, removing duplicates. Hrefs are normally
+        # site-relative, which needs only a prefix rather than a full urljoin.
+        return list(dict.fromkeys(
+            self.DETAIL_BASE + href if href.startswith("/") and not href.startswith("//")
+            else urljoin(self.DETAIL_BASE, href)
+            for href in _XP_LISTING_HREFS(main_sections[0])
+        ))
+    
+    def _scrape_link(self, link: str) -> Optional[Dict]:
+        """Worker for scrape_listings: parse one listing, then pause politely"""
+        try:
+            return self.parse_detail_page(link)
+        except Exception as e:
+            logger.error(f"❌ Error on listing {link}: {str(e)[:100]}")
+            # Continue to next listing instead of crashing
+            return None
+        finally:
+            # Random delay to be respectful (per worker)
+            time.sleep(random.uniform(*self.delay))
 
 
 if __name__ == "__main__":
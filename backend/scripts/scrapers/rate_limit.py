@@ -0,0 +1,44 @@
+"""
+Request rate limiting shared by the scrapers
+"""
+
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Token bucket shared by the worker threads; acquire() blocks until a request may go out"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Reserve the token now (tokens may go negative) so waiters queue up fairly
+            wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0
+            self.tokens -= 1
+        if wait > 0:
+            time.sleep(wait)
+
+
+def rps_from_env(default: float) -> float:
+    """OLX_RPS as a float; the default when it is unset, empty or not a number"""
+    value = os.getenv("OLX_RPS", "").strip()
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning("Ignoring invalid OLX_RPS=%r, using %s", value, default)
+        return default
@@ -18,13 +18,18 @@ Env:
 
 import argparse
 import os
-from collections import defaultdict
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List
 
+import pandas as pd
 from dotenv import load_dotenv
+from postgrest.exceptions import APIError
 from supabase import create_client
 
 
+@lru_cache(maxsize=None)
 def supabase_client():
     load_dotenv()
     url = os.getenv("SUPABASE_URL")
@@ -34,141 +39,162 @@ def supabase_client():
     return create_client(url, key)
 
 
-def fetch_listings(table: str) -> List[Dict]:
-    client = supabase_client()
-    listings: List[Dict] = []
+COLUMNS = ["municipality", "price_numeric", "square_m2", "ad_type"]
+
+
+def iter_batches(table: str, client=None) -> Iterator[List[Dict]]:
+    """
+    Yield active listings in 1000-row batches. The row count comes first,
+    then every range is requested concurrently and yielded in order.
+    """
+    client = client or supabase_client()
+    columns = ", ".join(COLUMNS)
     batch_size = 1000
-    offset = 0
-    while True:
+    # Ranges are separate requests, so they need a stable total order; ids
+    # repeat across sources in the all_listings view
+    order = ["source", "id"] if table == "all_listings" else ["id"]
+
+    def ordered(query):
+        for column in order:
+            query = query.order(column)
+        return query
+
+    head = (
+        ordered(client.table(table).select(columns, count="exact"))
+        .eq("is_active", True)
+        .range(0, batch_size - 1)
+        .execute()
+    )
+    yield head.data or []
+    total = head.count or 0
+
+    def fetch_range(offset: int) -> List[Dict]:
         resp = (
-            client.table(table)
-            .select("municipality, price_numeric, square_m2, ad_type")
+            ordered(client.table(table).select(columns))
             .eq("is_active", True)
             .range(offset, offset + batch_size - 1)
             .execute()
         )
-        batch = resp.data or []
-        if not batch:
-            break
-        listings.extend(batch)
-        if len(batch) < batch_size:
-            break
-        offset += batch_size
-    return listings
+        return resp.data or []
+
+    # map() keeps the ranges in order
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        yield from pool.map(fetch_range, range(batch_size, total, batch_size))
+
+
+def fetch_listings(table: str, client=None) -> List[Dict]:
+    return list(chain.from_iterable(iter_batches(table, client)))
+
+
+def listings_frame(batches: Iterable[List[Dict]]) -> pd.DataFrame:
+    """Turn each batch into columns as it arrives, so the row dicts never pile up."""
+    frames = [pd.DataFrame(batch, columns=COLUMNS) for batch in batches]
+    if not frames:
+        return pd.DataFrame(columns=COLUMNS)
+    return pd.concat(frames, ignore_index=True)
 
 
 PPM_MIN = 5       # minimum plausible KM/m²
 PPM_MAX = 20000    # maximum plausible KM/m²
 
 
-def summarize(listings: List[Dict]):
+def _summarize_entry(count, avg_price, avg_size):
+    avg_price = float(avg_price or 0)
+    avg_size = float(avg_size or 0)
+    price_per_m2 = avg_price / avg_size if avg_size > 0 else 0
+    return {
+        "count": int(count),
+        "avg_price": round(avg_price, 2),
+        "avg_size": round(avg_size, 2),
+        "price_per_m2": round(price_per_m2, 2),
+    }
+
+
+def _municipality_results(groups) -> List[Dict]:
+    """Build per-municipality results from (municipality, ad_type, count, avg_price, avg_size) rows."""
+    by_muni: Dict[str, Dict] = {}
+    for muni, ad_type, count, avg_price, avg_size in groups:
+        entry = by_muni.setdefault(muni, {"prodaja": _summarize_entry(0, 0, 0), "iznajmljivanje": _summarize_entry(0, 0, 0)})
+        entry["prodaja" if ad_type == "Prodaja" else "iznajmljivanje"] = _summarize_entry(count, avg_price, avg_size)
+
+    results = [
+        {
+            "municipality": muni,
+            "total_count": entry["prodaja"]["count"] + entry["iznajmljivanje"]["count"],
+            **entry,
+        }
+        for muni, entry in by_muni.items()
+    ]
+    results.sort(key=lambda x: x["total_count"], reverse=True)
+    return results
+
+
+def summarize(listings):
+    """Accepts a list of listing dicts or a frame from listings_frame()."""
+    df = pd.DataFrame(listings, columns=COLUMNS)
+    muni = df["municipality"].where(df["municipality"].notna() & (df["municipality"] != ""), "Unknown")
+    ad_type = df["ad_type"]
+
+    # A row counts as priced and sized only when both values parse
+    price = pd.to_numeric(df["price_numeric"], errors="coerce")
+    size = pd.to_numeric(df["square_m2"], errors="coerce")
+    parsed = price.notna() & size.notna()
+    price = price.where(parsed)
+    size = size.where(parsed)
+    ppm = price / size
+    has_ppm = parsed & (price != 0) & (size > 0)
+    plausible = ppm.between(PPM_MIN, PPM_MAX)
+
     # Diagnostics counters
-    dropped_unknown = 0
-    inferred_prodaja = 0
-    dropped_insufficient = 0
-    missing_price = 0
-    missing_size = 0
-    ppm_entries = {"Prodaja": [], "Iznajmljivanje": []}  # ad_type -> list of (ppm, muni, price, size)
+    missing_price = int((~parsed).sum())
+    missing_size = int((~parsed | (size == 0)).sum())
 
     # Find minimum price_per_m2 among Prodaja
-    prodaja_ppm = []
-    for item in listings:
-        if item.get("ad_type") == "Prodaja":
-            try:
-                price = float(item.get("price_numeric"))
-                size = float(item.get("square_m2"))
-                if price and size:
-                    prodaja_ppm.append(price / size)
-            except (TypeError, ValueError):
-                continue
-    min_prodaja_ppm = min(prodaja_ppm) if prodaja_ppm else None
-
-    stats = defaultdict(
-        lambda: {
-            "Prodaja": {"count": 0, "prices": [], "sizes": []},
-            "Iznajmljivanje": {"count": 0, "prices": [], "sizes": []},
-        }
-    )
+    prodaja_ppm = ppm[(ad_type == "Prodaja") & parsed & (price != 0) & (size != 0)]
+    min_prodaja_ppm = prodaja_ppm.min() if not prodaja_ppm.empty else None
 
-    for listing in listings:
-        muni = listing.get("municipality") or "Unknown"
-        ad_type = listing.get("ad_type")
-        try:
-            price = float(listing.get("price_numeric"))
-            size = float(listing.get("square_m2"))
-        except (TypeError, ValueError):
-            price = None
-            size = None
-        if price is None:
-            missing_price += 1
-        if size is None or size == 0:
-            missing_size += 1
-
-        # Infer unknowns as Prodaja if price_per_m2 above min Prodaja; else skip
-        if not ad_type or ad_type == "Unknown":
-            if price and size and size > 0 and min_prodaja_ppm is not None:
-                ppm = price / size
-                if ppm < PPM_MIN or ppm > PPM_MAX:
-                    dropped_unknown += 1
-                    continue
-                if ppm >= min_prodaja_ppm:
-                    ad_type = "Prodaja"
-                    inferred_prodaja += 1
-                else:
-                    dropped_unknown += 1
-                    continue
-            else:
-                dropped_insufficient += 1
-                continue
-
-        # Skip implausible ppm
-        if price and size and size > 0:
-            ppm = price / size
-            if ppm < PPM_MIN or ppm > PPM_MAX:
-                continue
-
-        bucket = stats[muni]["Prodaja" if ad_type == "Prodaja" else "Iznajmljivanje"]
-        bucket["count"] += 1
-        if price:
-            bucket["prices"].append(price)
-        if size:
-            bucket["sizes"].append(size)
-        if price and size and size > 0 and ad_type in ("Prodaja", "Iznajmljivanje"):
-            ppm_entries[ad_type].append((price / size, muni, price, size))
-
-    def summarize_entry(entry):
-        avg_price = sum(entry["prices"]) / len(entry["prices"]) if entry["prices"] else 0
-        avg_size = sum(entry["sizes"]) / len(entry["sizes"]) if entry["sizes"] else 0
-        price_per_m2 = avg_price / avg_size if avg_size > 0 else 0
-        return {
-            "count": entry["count"],
-            "avg_price": round(avg_price, 2),
-            "avg_size": round(avg_size, 2),
-            "price_per_m2": round(price_per_m2, 2),
-        }
+    # Infer unknowns as Prodaja if price_per_m2 above min Prodaja; else skip
+    unknown = ad_type.isna() | (ad_type == "") | (ad_type == "Unknown")
+    if min_prodaja_ppm is not None:
+        evaluable = unknown & has_ppm
+        inferred = evaluable & plausible & (ppm >= min_prodaja_ppm)
+    else:
+        evaluable = inferred = pd.Series(False, index=df.index)
+    inferred_prodaja = int(inferred.sum())
+    dropped_unknown = int((evaluable & ~inferred).sum())
+    dropped_insufficient = int((unknown & ~evaluable).sum())
 
-    results = []
-    for muni, data in stats.items():
-        prodaja = summarize_entry(data["Prodaja"])
-        iznajmljivanje = summarize_entry(data["Iznajmljivanje"])
-        total_count = prodaja["count"] + iznajmljivanje["count"]
-        results.append(
-            {
-                "municipality": muni,
-                "total_count": total_count,
-                "prodaja": prodaja,
-                "iznajmljivanje": iznajmljivanje,
-            }
-        )
+    # Skip implausible ppm
+    kept = (~unknown & ~(has_ppm & ~plausible)) | inferred
+    ad_type = ad_type.where(~inferred, "Prodaja")
 
-    results.sort(key=lambda x: x["total_count"], reverse=True)
+    # Categorical keys let groupby work on integer codes instead of hashing strings
+    buckets = pd.DataFrame({
+        "municipality": muni[kept].astype("category"),
+        "bucket": pd.Categorical(
+            ad_type[kept].where(ad_type[kept] == "Prodaja", "Iznajmljivanje"),
+            categories=["Prodaja", "Iznajmljivanje"],
+        ),
+        "price": price[kept].where(price[kept] != 0),
+        "size": size[kept].where(size[kept] != 0),
+    })
+    grouped = buckets.groupby(["municipality", "bucket"], sort=False, observed=True).agg(
+        count=("bucket", "size"), avg_price=("price", "mean"), avg_size=("size", "mean")
+    )
+    grouped = grouped.fillna(0)
+
+    results = _municipality_results(grouped.reset_index().itertuples(index=False, name=None))
     # Outliers: top/bottom ppm
-    bottom_ppm = {
-        k: sorted(v, key=lambda x: x[0])[:10] for k, v in ppm_entries.items()
-    }
-    top_ppm = {
-        k: sorted(v, key=lambda x: x[0])[-10:] for k, v in ppm_entries.items()
-    }
+    entries = pd.DataFrame({"ppm": ppm, "municipality": muni, "price": price, "size": size})
+    bottom_ppm = {}
+    top_ppm = {}
+    for ad in ("Prodaja", "Iznajmljivanje"):
+        candidates = entries[kept & has_ppm & (ad_type == ad)]
+        # Partial selection instead of a full sort; ties keep row order
+        bottom = candidates.nsmallest(10, "ppm", keep="first").sort_index().sort_values("ppm", kind="stable")
+        top = candidates.nlargest(10, "ppm", keep="last").sort_index().sort_values("ppm", kind="stable")
+        bottom_ppm[ad] = list(bottom.itertuples(index=False, name=None))
+        top_ppm[ad] = list(top.itertuples(index=False, name=None))
 
     return (
         results,
@@ -182,13 +208,127 @@ def summarize(listings: List[Dict]):
     )
 
 
+def summarize_from_supabase(table: str, client=None):
+    """
+    Same result as summarize(), computed server-side by the municipality_stats
+    RPC so only the grouped rows and outliers cross the wire. Returns None when
+    the function is not installed.
+
+    The RPC (run once in the Supabase SQL editor):
+
+        create or replace function municipality_stats(table_name text)
+        returns json
+        language plpgsql stable as $$
+        declare
+          result json;
+        begin
+          execute format($q$
+            with parsed as (
+              select coalesce(nullif(municipality, ''), 'Unknown') as municipality,
+                     nullif(nullif(ad_type, ''), 'Unknown') as ad_type,
+                     case when square_m2 is not null then price_numeric::float8 end as price,
+                     case when price_numeric is not null then square_m2::float8 end as size
+              from %I where is_active
+            ),
+            floor as (
+              select min(price / size) as ppm from parsed
+              where ad_type = 'Prodaja' and price <> 0 and size <> 0
+            ),
+            scored as (
+              select p.municipality, p.price, p.size, x.ppm,
+                     p.ad_type is null as unknown,
+                     p.ad_type is null and x.ppm is not null and f.ppm is not null as evaluable,
+                     coalesce(p.ad_type is null and x.ppm between 5 and 20000 and x.ppm >= f.ppm, false) as inferred,
+                     p.ad_type
+              from parsed p
+              cross join floor f
+              cross join lateral (
+                select case when p.price <> 0 and p.size > 0 then p.price / p.size end as ppm
+              ) x
+            ),
+            kept as (
+              select municipality, price, size, ppm,
+                     case when inferred then 'Prodaja' else ad_type end as ad_type
+              from scored
+              where inferred or (not unknown and coalesce(ppm between 5 and 20000, true))
+            ),
+            ranked as (
+              select ad_type, ppm, municipality, price, size,
+                     row_number() over (partition by ad_type order by ppm) as lo,
+                     row_number() over (partition by ad_type order by ppm desc) as hi
+              from kept
+              where ppm is not null and ad_type in ('Prodaja', 'Iznajmljivanje')
+            )
+            select json_build_object(
+              'groups', (
+                select json_agg(g) from (
+                  select municipality,
+                         case when ad_type = 'Prodaja' then 'Prodaja' else 'Iznajmljivanje' end as ad_type,
+                         count(*) as count,
+                         avg(nullif(price, 0)) as avg_price,
+                         avg(nullif(size, 0)) as avg_size
+                  from kept group by 1, 2
+                ) g
+              ),
+              'outliers', (
+                select json_agg(o order by o.ppm) from ranked o where lo <= 10 or hi <= 10
+              ),
+              'inferred_prodaja', count(*) filter (where inferred),
+              'dropped_unknown', count(*) filter (where evaluable and not inferred),
+              'dropped_insufficient', count(*) filter (where unknown and not evaluable),
+              'missing_price', count(*) filter (where price is null),
+              'missing_size', count(*) filter (where price is null or size = 0)
+            ) from scored
+          $q$, table_name) into result;
+          return result;
+        end $$;
+
+    The 5 and 20000 bounds are PPM_MIN and PPM_MAX.
+    """
+    client = client or supabase_client()
+    try:
+        resp = client.rpc("municipality_stats", {"table_name": table}).execute()
+    except APIError:
+        return None  # function not installed; caller falls back to summarize()
+    data = resp.data
+
+    groups = (
+        (row["municipality"], row["ad_type"], row["count"], row["avg_price"], row["avg_size"])
+        for row in data.get("groups") or []
+    )
+    bottom_ppm = {"Prodaja": [], "Iznajmljivanje": []}
+    top_ppm = {"Prodaja": [], "Iznajmljivanje": []}
+    for row in data.get("outliers") or []:
+        entry = (row["ppm"], row["municipality"], row["price"], row["size"])
+        if row["lo"] <= 10:
+            bottom_ppm[row["ad_type"]].append(entry)
+        if row["hi"] <= 10:
+            top_ppm[row["ad_type"]].append(entry)
+
+    return (
+        _municipality_results(groups),
+        data["inferred_prodaja"],
+        data["dropped_unknown"],
+        data["dropped_insufficient"],
+        data["missing_price"],
+        data["missing_size"],
+        bottom_ppm,
+        top_ppm,
+    )
+
+
 def main():
     parser = argparse.ArgumentParser(description="Compute municipality statistics by ad_type.")
     parser.add_argument("--table", default="all_listings", help="Supabase table (default: all_listings)")
     args = parser.parse_args()
 
-    listings = fetch_listings(args.table)
-    print(f"Fetched {len(listings)} active rows from {args.table}")
+    summary = summarize_from_supabase(args.table)
+    if summary is None:
+        listings = listings_frame(iter_batches(args.table))
+        print(f"Fetched {len(listings)} active rows from {args.table}")
+        summary = summarize(listings)
+    else:
+        print(f"Aggregated active rows from {args.table} server-side")
 
     (
         results,
@@ -199,13 +339,20 @@ def main():
         missing_size,
         bottom_ppm,
         top_ppm,
-    ) = summarize(listings)
+    ) = summary
     for stat in results:
         print(
             f"{stat['municipality']}: total={stat['total_count']} | "
             f"Prodaja(count={stat['prodaja']['count']}, avg={stat['prodaja']['avg_price']}, ppm={stat['prodaja']['price_per_m2']}) | "
             f"Iznajmljivanje(count={stat['iznajmljivanje']['count']}, avg={stat['iznajmljivanje']['avg_price']}, ppm={stat['iznajmljivanje']['price_per_m2']})"
         )
+    # Country-wide rollup, derived from the per-municipality groups
+    prodaja_total = sum(stat["prodaja"]["count"] for stat in results)
+    iznajmljivanje_total = sum(stat["iznajmljivanje"]["count"] for stat in results)
+    print(
+        f"All municipalities: total={prodaja_total + iznajmljivanje_total} | "
+        f"Prodaja(count={prodaja_total}) | Iznajmljivanje(count={iznajmljivanje_total})"
+    )
     print("-" * 80)
     print(
         f"Diagnostics: inferred_prodaja={inferred_prodaja}, "
@@ -4,8 +4,10 @@ Test script for running OLX and Nekretnine scrapers with duplicate checking
 Saves data to database after each page for long-running scrapes
 """
 
+import logging
 import os
 import sys
+from functools import lru_cache
 from dotenv import load_dotenv
 from supabase import create_client
 
@@ -18,6 +20,20 @@ from scripts.scrapers.nekretnine_scraper import NekretnineScraper
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def _get_supabase():
+    """Shared Supabase client, or None when credentials are missing"""
+    supabase_url = os.getenv("SUPABASE_URL")
+    supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.getenv("SUPABASE_KEY")
+    
+    if not supabase_url or not supabase_key:
+        return None
+    
+    return create_client(supabase_url, supabase_key)
+
 
 def test_olx_scraper(max_pages=5):
     """Test OLX scraper with database integration and page-by-page saving"""
@@ -26,24 +42,27 @@ def test_olx_scraper(max_pages=5):
     print("="*70)
     
     # Initialize Supabase client
-    supabase_url = os.getenv("SUPABASE_URL")
-    supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.getenv("SUPABASE_KEY")
+    supabase = _get_supabase()
     
-    if not supabase_url or not supabase_key:
+    if not supabase:
         print("❌ Error: SUPABASE_URL and SUPABASE_KEY must be set in .env file")
         return {"saved": 0, "duplicates": 0, "errors": 0, "total": 0}
     
-    supabase = create_client(supabase_url, supabase_key)
-    
     # Initialize scraper with page callback for saving
     from scrapers.olx_scraper import OLXScraper
     import random
     import time
-    from bs4 import BeautifulSoup
-    from urllib.parse import urljoin
+    from concurrent.futures import ThreadPoolExecutor, as_completed
     
-    scraper = OLXScraper(delay=(2.0, 5.0))
-    scraper._init_driver()
+    # Stored external IDs are loaded once, so duplicates are skipped in memory
+    scraper = OLXScraper(delay=(2.0, 5.0), supabase_client=supabase)
+    
+    def fetch_listing(link):
+        try:
+            return scraper.parse_detail_page(link)
+        finally:
+            # Per-worker random delay keeps the request rate polite
+            time.sleep(random.uniform(*scraper.delay))
     
     # Track statistics
     total_saved = 0
@@ -58,30 +77,18 @@ def test_olx_scraper(max_pages=5):
             print(f"📄 SCRAPING PAGE {page}/{max_pages}")
             print(f"{'='*70}")
             
-            # Fetch page HTML
+            # Search pages are fetched over HTTP; the browser is only a fallback
             search_url = scraper.BASE_URL.format(page)
-            html = scraper.fetch_page_source(search_url)
-            
-            if not html:
-                print(f"⚠️  Could not fetch page {page}")
+            try:
+                links = scraper.fetch_search_links(search_url)
+            except Exception as e:
+                print(f"⚠️  Could not fetch page {page}: {str(e)[:30]}")
                 continue
             
-            # Parse listing links from page
-            soup = BeautifulSoup(html, "lxml")
-            main_section = soup.find("main", class_="articles")
-            
-            if not main_section:
+            if links is None:
                 print(f"⚠️  No listings section found on page {page}")
                 continue
             
-            # Extract listing links
-            links = [
-                urljoin(scraper.DETAIL_BASE, a["href"])
-                for a in main_section.find_all("a", href=True)
-                if "/artikal/" in a.get("href", "")
-            ]
-            links = list(dict.fromkeys(links))  # Remove duplicates
-            
             if not links:
                 print(f"⚠️  No listings found on page {page}")
                 break
@@ -89,55 +96,73 @@ def test_olx_scraper(max_pages=5):
             print(f"Found {len(links)} listings on page {page}")
             total_found += len(links)
             
-            # Parse and save each listing
+            external_ids = {link: scraper.external_id_from_url(link) for link in links}
+            if scraper.existing_ids:
+                seen = scraper.existing_ids
+            else:
+                # IDs could not be preloaded; check the whole page in one query
+                existing = supabase.table('listings_olx')\
+                    .select('external_id')\
+                    .in_('external_id', list(external_ids.values()))\
+                    .execute()
+                seen = {row['external_id'] for row in existing.data or []}
+            
+            # Parse each new listing, then save the page in one insert
             page_saved = 0
             page_duplicates = 0
             page_errors = 0
+            batch = []
             
-            for idx, link in enumerate(links, 1):
-                print(f"  Processing listing {idx}/{len(links)}...", end=" ")
-                
-                try:
-                    # Extract external_id from URL to check database first
-                    import re
-                    url_match = re.search(r'/artikal/(\d+)', link)
-                    if url_match:
-                        external_id = f"olx_{url_match.group(1)}"
-                        
-                        # Check if already in database BEFORE parsing
-                        existing = supabase.table('listings_olx')\
-                            .select('id')\
-                            .eq('external_id', external_id)\
-                            .execute()
+            new_links = []
+            for link in links:
+                if external_ids[link] in seen:
+                    page_duplicates += 1
+                else:
+                    new_links.append(link)
+            print(f"  🔄 Duplicates skipped: {page_duplicates}")
+            
+            # Fetch detail pages concurrently, like scrape_listings does
+            with ThreadPoolExecutor(max_workers=scraper.max_workers) as pool:
+                futures = {pool.submit(fetch_listing, link): link for link in new_links}
+                for idx, future in enumerate(as_completed(futures), 1):
+                    try:
+                        listing = future.result()
                         
-                        if existing.data:
-                            print("🔄 Duplicate (skipped)")
-                            page_duplicates += 1
+                        # Per-listing progress only at DEBUG; the page summary reports the counts
+                        if not listing:
+                            logger.debug("  Listing %d/%d... ❌ No data", idx, len(new_links))
+                            page_errors += 1
                             continue
-                    
-                    # Parse listing detail page only if not duplicate
-                    listing = scraper.parse_detail_page(link)
-                    
-                    if not listing:
-                        print("❌ No data")
+                        
+                        batch.append(listing)
+                        logger.debug("  Listing %d/%d... ✅ Parsed", idx, len(new_links))
+                        
+                        # Keep sample
+                        if len(all_sample_listings) < 1:
+                            all_sample_listings.append(listing)
+                        
+                    except Exception as e:
                         page_errors += 1
-                        continue
-                    
-                    # Save new listing
-                    supabase.table('listings_olx').insert(listing).execute()
-                    page_saved += 1
-                    print("✅ Saved")
-                    
-                    # Keep sample
-                    if len(all_sample_listings) < 1:
-                        all_sample_listings.append(listing)
-                    
-                    # Random delay between listings
-                    time.sleep(random.uniform(*scraper.delay))
-                    
+                        print(f"  ❌ Error on {futures[future]}: {str(e)[:30]}")
+            
+            for start in range(0, len(batch), 500):
+                chunk = batch[start:start + 500]
+                try:
+                    supabase.table('listings_olx').insert(chunk, returning='minimal').execute()
+                    page_saved += len(chunk)
                 except Exception as e:
-                    page_errors += 1
-                    print(f"❌ Error: {str(e)[:30]}")
+                    # One bad row fails the whole insert; retry row by row
+                    print(f"⚠️  Batch insert failed ({str(e)[:30]}), saving individually")
+                    for listing in chunk:
+                        try:
+                            supabase.table('listings_olx').insert(listing, returning='minimal').execute()
+                            page_saved += 1
+                        except Exception as e:
+                            page_errors += 1
+                            print(f"❌ Error saving {listing.get('external_id')}: {str(e)[:30]}")
+            
+            # Listings repeat across pages; later pages skip what was just saved
+            scraper.existing_ids.update(listing['external_id'] for listing in batch)
             
             # Update totals
             total_saved += page_saved
@@ -161,7 +186,7 @@ def test_olx_scraper(max_pages=5):
         import traceback
         traceback.print_exc()
     finally:
-        scraper._close_driver()
+        scraper.cleanup()
     
     # Print final results
     print("\n" + "="*70)
@@ -196,15 +221,12 @@ def test_nekretnine_scraper(max_pages=2):
     print("="*70)
     
     # Initialize Supabase client
-    supabase_url = os.getenv("SUPABASE_URL")
-    supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.getenv("SUPABASE_KEY")
+    supabase = _get_supabase()
     
-    if not supabase_url or not supabase_key:
+    if not supabase:
         print("❌ Error: SUPABASE_URL and SUPABASE_KEY must be set in .env file")
         return
     
-    supabase = create_client(supabase_url, supabase_key)
-    
     # Initialize scraper with Supabase client
     scraper = NekretnineScraper(
         delay=(2, 4), 
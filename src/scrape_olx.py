@@ -6,145 +6,316 @@ Continues scraping even if timeouts or network errors occur.
 import os
 import time
 import csv
+import logging
 import re
-import random
+import queue
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urljoin
-from bs4 import BeautifulSoup
+import requests
+from requests.adapters import HTTPAdapter
+import lxml.html
+from lxml import etree
 from selenium import webdriver
 from selenium.webdriver.firefox.options import Options
 from selenium.webdriver.firefox.service import Service
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import WebDriverException, TimeoutException
 
+logger = logging.getLogger(__name__)
+
+def rps_from_env(default):
+    """OLX_RPS as a float; the default when it is unset, empty or not a number"""
+    value = os.getenv("OLX_RPS", "").strip()
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning("Ignoring invalid OLX_RPS=%r, using %s", value, default)
+        return default
+
 # --- Paths ---
 firefox_binary = "/usr/bin/firefox"
 geckodriver_binary = "/home/mustafasinanovic/miniforge3/bin/geckodriver"
 
 # --- Config ---
+# CSS selectors signalling that a page has rendered enough to parse
+SEARCH_READY = "main.articles"
+DETAIL_READY = "h1, .price-heading"
+
 BASE_URL = "https://olx.ba/pretraga?attr=&attr_encoded=1&q=stanovi&category_id=23&page={}&canton=9"
 OUTPUT_CSV = "data/sarajevo_flats.csv"
 MAX_PAGES = 50
-REQUEST_DELAY = (2, 5)
+MAX_RPS = rps_from_env(2)  # requests per second to olx.ba, across all workers
+MAX_WORKERS = 8  # detail pages fetched concurrently
+MAX_DRIVERS = 3  # Firefox instances for pages the static fetch cannot parse
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64; rv:115.0) Gecko/20100101 Firefox/115.0"
 
 os.makedirs("data", exist_ok=True)
 
+# CSV columns; parsed rows are tuples in this order so csv.writer takes them as-is
+Listing = namedtuple("Listing", ["title","url","price_numeric","municipality",
+                                 "condition","ad_type","property_type","rooms","square_m2","equipment","level","heating"])
+
+# One keep-alive HTTP session shared by the worker threads
+SESSION = requests.Session()
+SESSION.headers.update({"User-Agent": USER_AGENT, "Accept-Encoding": "gzip, deflate"})
+SESSION.mount("https://", HTTPAdapter(pool_maxsize=MAX_WORKERS))
+
+NON_DIGITS = re.compile(r"[^0-9]")
+FIRST_NUMBER = re.compile(r"(\d+)")
+
+def has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+# Detail page XPaths, compiled once
+XP = {
+    "title": etree.XPath("//h1"),
+    "title_alt": etree.XPath(f"//*[{has_class('main-title-listing')}]"),
+    "price": etree.XPath(f"//*[{has_class('price-heading')}]"),
+}
+# Attribute blocks are read in one pass: div.required-wrap:nth-child(N) > div:nth-child(2) > h4:nth-child(2)
+XP_REQUIRED_WRAPS = etree.XPath(f"//div[{has_class('required-wrap')}]")
+XP_REQUIRED_VALUE = etree.XPath("./*[2][self::div]/*[2][self::h4]")
+REQUIRED_FIELDS = {2: "condition", 3: "ad_type", 4: "property_type", 5: "rooms",
+                   6: "square_m2", 7: "equipment", 8: "level", 9: "heating"}
+XP_CITY_TEXT = etree.XPath(f"(//div[{has_class('btn-pill')} and {has_class('city')}])[1]//text()[not(ancestor::svg)]")
+XP_SEARCH_MAIN = etree.XPath(f"//main[{has_class('articles')}]")
+# Only listing anchors; filtered inside the XPath so other links are never materialized
+XP_HREFS = etree.XPath(".//a[contains(@href, '/artikal/')]/@href")
+
+# Nothing is looked up by id, so skip building the id index. lxml locks a
+# parser while it is in use, so every worker thread gets its own.
+_parsers = threading.local()
+
+def parse_html(html):
+    if not hasattr(_parsers, "html"):
+        _parsers.html = lxml.html.HTMLParser(collect_ids=False)
+    return lxml.html.document_fromstring(html, parser=_parsers.html)
+
+def absolute_url(href):
+    # Listing hrefs are site-relative ("/artikal/..."); skip urljoin's full parse for those
+    if href.startswith("/") and not href.startswith("//"):
+        return "https://olx.ba" + href
+    return urljoin("https://olx.ba", href)
+
+class RateLimiter:
+    """Token bucket shared by the worker threads; acquire() blocks until a request may go out"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Reserve the token now (tokens may go negative) so waiters queue up fairly
+            wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0
+            self.tokens -= 1
+        if wait > 0:
+            time.sleep(wait)
+
+LIMITER = RateLimiter(MAX_RPS) if MAX_RPS > 0 else None  # OLX_RPS=0 disables the limit
+
+def throttle():
+    if LIMITER:
+        LIMITER.acquire()
+
 def clean_text(s):
-    return " ".join(s.split()).strip() if s else None
+    return " ".join(s.split()) if s else None  # split() already drops outer whitespace
 
 def extract_price(text):
     if not text:
         return None
-    cleaned = re.sub(r"[^0-9]", "", text)
+    cleaned = NON_DIGITS.sub("", text)
     return int(cleaned) if cleaned else None
 
 def extract_number(text):
     if not text:
         return None
-    m = re.search(r"(\d+)", text)
+    m = FIRST_NUMBER.search(text)
     return int(m.group(1)) if m else None
 
-def fetch_page_source(url, driver):
+def fetch_page_source(url, driver, ready_selector=DETAIL_READY):
     try:
+        throttle()
         driver.get(url)
-        time.sleep(3)  # simple wait
+        try:
+            # Return as soon as the content we parse is in the DOM
+            WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, ready_selector))
+            )
+        except TimeoutException:
+            time.sleep(1)  # not found; give the page a last moment and parse what is there
         return driver.page_source
     except (TimeoutException, WebDriverException, OSError) as e:
-        print(f"[!] Failed to load page: {url} → {e}")
+        logger.warning("Failed to load page: %s → %s", url, e)
         return None
     except Exception as e:
-        print(f"[!] Unexpected error loading page: {url} → {e}")
+        logger.warning("Unexpected error loading page: %s → %s", url, e)
+        return None
+
+def fetch_static(url):
+    """Plain HTTP GET without a browser; None on failure"""
+    try:
+        throttle()
+        response = SESSION.get(url, timeout=15)
+        return response.text if response.status_code == 200 else None
+    except requests.RequestException:
         return None
 
-def parse_detail_page(url, driver):
-    html = fetch_page_source(url, driver)
+def parse_detail_page(url, drivers):
+    # Server-rendered HTML is enough for most listings; otherwise borrow a
+    # Firefox from the pool (a driver is not thread-safe, so one user at a time)
+    details = parse_detail_html(url, fetch_static(url), quiet=True)
+    if details:
+        return details
+    driver = drivers.get()
+    try:
+        html = fetch_page_source(url, driver)
+    finally:
+        drivers.put(driver)
+    return parse_detail_html(url, html)
+
+def parse_detail_html(url, html, quiet=False):
     if not html:
         return None
 
     try:
-        soup = BeautifulSoup(html, "lxml")
-        get_text = lambda sel: clean_text(soup.select_one(sel).get_text()) if soup.select_one(sel) else None
-
-        title = get_text("h1") or get_text(".main-title-listing")
-        price_numeric = extract_price(get_text(".price-heading"))
-
-        municipality_tag = soup.find("div", class_="btn-pill city")
-        if municipality_tag:
-            for svg in municipality_tag.find_all("svg"): svg.decompose()
-            municipality = clean_text(municipality_tag.get_text())
-        else:
-            municipality = None
+        tree = parse_html(html)
+        def get_text(name):
+            found = XP[name](tree)
+            return clean_text(found[0].text_content()) if found else None
+
+        title = get_text("title") or get_text("title_alt")
+        if not title and quiet:
+            return None  # content not rendered; caller falls back to Selenium
+        price_numeric = extract_price(get_text("price"))
+
+        # Location text without the SVG icon
+        municipality = clean_text("".join(XP_CITY_TEXT(tree)))
+
+        required = {}
+        for wrap in XP_REQUIRED_WRAPS(tree):
+            position = sum(1 for _ in wrap.itersiblings(etree.Element, preceding=True)) + 1
+            field = REQUIRED_FIELDS.get(position)
+            value = XP_REQUIRED_VALUE(wrap) if field and field not in required else None
+            if value:
+                required[field] = clean_text(value[0].text_content())
         
-        rooms = extract_number(get_text("div.required-wrap:nth-child(5) > div:nth-child(2) > h4:nth-child(2)"))
-        square_m2_text = get_text("div.required-wrap:nth-child(6) > div:nth-child(2) > h4:nth-child(2)")
+        rooms = extract_number(required.get("rooms"))
+        square_m2_text = required.get("square_m2")
         try:
             square_m2 = float(square_m2_text.replace(",", ".")) if square_m2_text else None
         except:
             square_m2 = None
 
-        details = {
-            "title": title,
-            "url": url,
-            "price_numeric": price_numeric,
-            "municipality": municipality,
-            "condition": get_text("div.required-wrap:nth-child(2) > div:nth-child(2) > h4:nth-child(2)"),
-            "ad_type": get_text("div.required-wrap:nth-child(3) > div:nth-child(2) > h4:nth-child(2)"),
-            "property_type": get_text("div.required-wrap:nth-child(4) > div:nth-child(2) > h4:nth-child(2)"),
-            "rooms": rooms,
-            "square_m2": square_m2,
-            "equipment": get_text("div.required-wrap:nth-child(7) > div:nth-child(2) > h4:nth-child(2)"),
-            "level": get_text("div.required-wrap:nth-child(8) > div:nth-child(2) > h4:nth-child(2)"),
-            "heating": get_text("div.required-wrap:nth-child(9) > div:nth-child(2) > h4:nth-child(2)")
-        }
-        print("Parsed:", details)
+        details = Listing(
+            title=title,
+            url=url,
+            price_numeric=price_numeric,
+            municipality=municipality,
+            condition=required.get("condition"),
+            ad_type=required.get("ad_type"),
+            property_type=required.get("property_type"),
+            rooms=rooms,
+            square_m2=square_m2,
+            equipment=required.get("equipment"),
+            level=required.get("level"),
+            heating=required.get("heating")
+        )
+        logger.debug("Parsed: %s", details)
         return details
     except Exception as e:
-        print(f"[!] Failed to parse details for {url} → {e}")
+        logger.warning("Failed to parse details for %s → %s", url, e)
         return None
 
-def scrape():
+def make_driver():
     options = Options()
     options.binary_location = firefox_binary
     options.add_argument("--headless")
+    # Only the HTML is parsed: skip images, styles and media, keep the HTTP cache
+    options.set_preference("permissions.default.image", 2)
+    options.set_preference("permissions.default.stylesheet", 2)
+    options.set_preference("media.autoplay.default", 5)
+    options.set_preference("browser.cache.disk.enable", True)
+    options.set_preference("browser.cache.memory.capacity", 65536)
+    # driver.get returns on DOMContentLoaded; fetch_page_source waits for content
+    options.page_load_strategy = "eager"
     service = Service(executable_path=geckodriver_binary)
-    driver = webdriver.Firefox(service=service, options=options)
+    # Drivers live for the whole run; keep the geckodriver command connection open
+    driver = webdriver.Firefox(service=service, options=options, keep_alive=True)
     driver.set_page_load_timeout(120)
+    return driver
 
-    fieldnames = ["title","url","price_numeric","municipality",
-                  "condition","ad_type","property_type","rooms","square_m2","equipment","level","heating"]
+def scrape():
+    drivers = queue.Queue()
+    for _ in range(MAX_DRIVERS):
+        drivers.put(make_driver())
 
     write_header = not os.path.exists(OUTPUT_CSV)
-    with open(OUTPUT_CSV, "a", newline="", encoding="utf-8") as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        if write_header: writer.writeheader()
+    # Listings saved by earlier runs (the CSV is appended to) are not fetched again
+    seen_urls = set()
+    if not write_header:
+        with open(OUTPUT_CSV, newline="", encoding="utf-8") as existing:
+            seen_urls.update(row["url"] for row in csv.DictReader(existing) if row.get("url"))
+    with open(OUTPUT_CSV, "a", newline="", encoding="utf-8") as csvfile, \
+            ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        writer = csv.writer(csvfile)
+        if write_header: writer.writerow(Listing._fields)
 
         for page in range(1, MAX_PAGES + 1):
             search_url = BASE_URL.format(page)
-            html = fetch_page_source(search_url, driver)
-            if not html:
-                print(f"[!] Skipping search page {page}")
-                continue
-
             try:
-                soup = BeautifulSoup(html, "lxml")
-                main_section = soup.find("main", class_="articles")
+                # Plain HTTP first; render in Firefox only if the listings are not in the HTML
+                html = fetch_static(search_url)
+                main_section = XP_SEARCH_MAIN(parse_html(html)) if html else []
+                if not main_section:
+                    driver = drivers.get()
+                    html = fetch_page_source(search_url, driver, SEARCH_READY)
+                    drivers.put(driver)
+                    if not html:
+                        logger.warning("Skipping search page %d", page)
+                        continue
+                    main_section = XP_SEARCH_MAIN(parse_html(html))
                 if not main_section:
                     continue
 
-                links = [urljoin("https://olx.ba", a["href"]) for a in main_section.find_all("a", href=True)]
-                print(f"Page {page}: found {len(links)} listings")
+                # Cards link each listing more than once; dedupe in page order
+                found = dict.fromkeys(absolute_url(href) for href in XP_HREFS(main_section[0]))
+                links = [link for link in found if link not in seen_urls]
+                logger.info("Page %d: found %d listings, %d new", page, len(found), len(links))
 
-                for link in links:
+                page_rows = []
+                futures = {pool.submit(parse_detail_page, link, drivers): link for link in links}
+                for future in as_completed(futures):
                     try:
-                        data = parse_detail_page(link, driver)
+                        data = future.result()
                         if data:
-                            writer.writerow(data)
-                        time.sleep(random.uniform(*REQUEST_DELAY))
+                            page_rows.append(data)
                     except Exception as e:
-                        print(f"[!] Skipping listing {link} due to error → {e}")
+                        logger.warning("Skipping listing %s due to error → %s", futures[future], e)
+
+                # One write per page; flush so an interrupted run keeps finished pages
+                writer.writerows(page_rows)
+                seen_urls.update(row.url for row in page_rows)
+                csvfile.flush()
             except Exception as e:
-                print(f"[!] Failed to parse search page {page} → {e}")
+                logger.warning("Failed to parse search page %d → %s", page, e)
 
-    driver.quit()
-    print(f"Finished. CSV saved at: {OUTPUT_CSV}")
+    while not drivers.empty():
+        drivers.get().quit()
+    logger.info("Finished. CSV saved at: %s", OUTPUT_CSV)
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     scrape()
\ No newline at end of file